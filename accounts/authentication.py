@@ -0,0 +1,227 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from quickfood_backend.conditional import bump_version, cache_is_shared, get_version
+from .models import ClaimsUser
+
+User = get_user_model()
+
+# Claims added by CustomTokenObtainPairSerializer.get_token
+USER_CLAIMS = ('username', 'email', 'role')
+
+# Bumped whenever any user changes, for responses that embed user details
+USERS_VERSION_KEY = 'accounts:users-version'
+
+
+class LocalTTLCache:
+    """
+    Thread-safe, size-bounded LRU cache local to the process. Entries expire
+    after ``timeout`` seconds, and ``get`` can also reject entries stored
+    before a given time.
+    """
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, stored_after=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if now - stored_at > self.timeout or (stored_after is not None and stored_at <= stored_after):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = LocalTTLCache(settings.AUTH_USER_CACHE['MAX_SIZE'], settings.AUTH_USER_CACHE['TIMEOUT'])
+token_cache = LocalTTLCache(settings.AUTH_USER_CACHE['MAX_SIZE'], settings.AUTH_USER_CACHE['TIMEOUT'])
+
+
+def changed_key(user_id):
+    return f'accounts:user-changed:{user_id}'
+
+
+def user_changed_at(user_id):
+    """
+    When the user row last changed, as a timestamp, if that was recent enough
+    for an unexpired access token to predate it.
+    """
+    return cache.get(changed_key(user_id))
+
+
+def claims_trusted():
+    """
+    Whether read requests may be authenticated from token claims alone. That
+    is only safe when change markers reach every process, so unless
+    AUTH_USER_CACHE['TRUST_CLAIMS'] says otherwise it requires a default
+    cache that is shared between processes.
+    """
+    trusted = settings.AUTH_USER_CACHE.get('TRUST_CLAIMS')
+    if trusted is None:
+        trusted = cache_is_shared()
+    return trusted
+
+
+def get_users_version():
+    return get_version(USERS_VERSION_KEY)
+
+
+def mark_user_changed(user_id):
+    """
+    Drop cached copies of the user, stop trusting claims in tokens issued
+    before now and retire validators of responses embedding user details.
+    The marker lives in the default cache, which claims_trusted requires to
+    be shared; this process's copy is dropped immediately.
+    """
+    user_cache.delete(user_id)
+    
+    def mark():
+        timeout = jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        cache.set(changed_key(user_id), time.time(), timeout=timeout)
+        bump_version(USERS_VERSION_KEY)
+        user_cache.delete(user_id)
+    
+    transaction.on_commit(mark)
+
+
+def get_cached_user(user_id):
+    """
+    Return a private copy of the user row, from the local cache when it is
+    fresh and has not changed since it was stored, else from the database.
+    """
+    user = user_cache.get(user_id, stored_after=user_changed_at(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        user_cache.set(user_id, user)
+    return copy.copy(user)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that loads the full user through the local user cache.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    For safe (read-only) requests, build the user from the token's verified
+    claims without touching the database. Unsafe requests, tokens without
+    the claims, tokens whose claims are older than the access token
+    lifetime (as after a refresh), tokens issued before the user last
+    changed (profile update, deactivation) and every request while
+    claims_trusted is false get the full user instead.
+    """
+    def authenticate(self, request):
+        if request.method not in permissions.SAFE_METHODS or not claims_trusted():
+            return super().authenticate(request)
+        
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_claims_user(validated_token), validated_token
+    
+    def get_claims_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        issued_at = validated_token.get('iat')
+        if user_id is None or issued_at is None or any(claim not in validated_token for claim in USER_CLAIMS):
+            return self.get_user(validated_token)
+        
+        # Change markers only last ACCESS_TOKEN_LIFETIME, but refreshed access
+        # tokens keep the refresh token's iat and claims, so older ones are
+        # not covered by any marker
+        if time.time() - issued_at > jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds():
+            return self.get_user(validated_token)
+        
+        changed_at = user_changed_at(user_id)
+        if changed_at is not None and issued_at <= changed_at:
+            return self.get_user(validated_token)
+        
+        user = ClaimsUser(id=user_id, is_active=True, **{claim: validated_token[claim] for claim in USER_CLAIMS})
+        user._state.adding = False
+        return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers which user a key belongs to and
+    loads that user through the local user cache.
+    """
+    def authenticate_credentials(self, key):
+        user_id = token_cache.get(key)
+        if user_id is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user_id = token.user_id
+            token_cache.set(key, user_id)
+            user_cache.set(user_id, token.user)
+        else:
+            token = self.get_model()(key=key, user_id=user_id)
+        
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        
+        return (user, token)
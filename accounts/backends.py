@@ -0,0 +1,59 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_backends, get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import ahash_password, acheck_user_password, check_user_password, hash_password
+
+UserModel = get_user_model()
+
+
+class PooledHashingBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords on the bounded hashing pool instead
+    of the request thread, with a native async variant for the async views.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so a missing user takes as long as a wrong password
+            hash_password(password)
+            return None
+        if check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            await ahash_password(password)
+            return None
+        if await acheck_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Async counterpart of ``django.contrib.auth.authenticate`` that awaits
+    backends with a native ``aauthenticate`` rather than running them all
+    in the shared sync thread.
+    """
+    for backend in get_backends():
+        if isinstance(backend, PooledHashingBackend):
+            user = await backend.aauthenticate(request, **credentials)
+        else:
+            user = await sync_to_async(backend.authenticate)(request, **credentials)
+        if user is not None:
+            user.backend = f'{backend.__module__}.{backend.__class__.__qualname__}'
+            return user
+    return None
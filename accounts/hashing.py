@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'MAX_PENDING': 16,
+    'QUEUE_TIMEOUT': 5,
+    'RETRY_AFTER': 1,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-in requests are being processed. Please try again shortly."
+    default_code = 'password_hashing_busy'
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        # Picked up by DRF's exception handler as the Retry-After header
+        self.wait = get_setting('RETRY_AFTER')
+
+
+class HashingPool:
+    """
+    Runs password hashing on a fixed number of threads so a burst of logins
+    cannot take every CPU from the rest of the API. At most ``workers`` hashes
+    run at once and ``max_pending`` more may wait; anything beyond that, or
+    anything that waits longer than ``timeout`` seconds, is shed with
+    PasswordHashingBusy.
+    """
+    def __init__(self, workers, max_pending, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHashingBusy()
+
+    async def arun(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHashingBusy()
+
+
+@lru_cache
+def get_pool():
+    return HashingPool(get_setting('WORKERS'), get_setting('MAX_PENDING'), get_setting('QUEUE_TIMEOUT'))
+
+
+def hash_password(raw_password):
+    return get_pool().run(make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    return await get_pool().arun(make_password, raw_password)
+
+
+def check_user_password(user, raw_password):
+    """
+    Pool-backed equivalent of ``user.check_password()``, including the
+    upgrade of hashes made with outdated parameters.
+    """
+    valid, must_update = get_pool().run(verify_password, raw_password, user.password)
+    if valid and must_update:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=['password'])
+    return valid
+
+
+async def acheck_user_password(user, raw_password):
+    valid, must_update = await get_pool().arun(verify_password, raw_password, user.password)
+    if valid and must_update:
+        user.password = await ahash_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return valid
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
+    # Name of the case-insensitive unique index on ``email``, used to recognise its violations
+    EMAIL_CONSTRAINT = 'unique_user_email_ci'
+    
     ROLE_CHOICES = (
         ('user', 'User'),
         ('restaurant_owner', 'Restaurant Owner'),
@@ -11,9 +15,34 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive uniqueness, backed by a functional index; blank emails are exempt
+            models.UniqueConstraint(
+                Lower('email'),
+                name='unique_user_email_ci',
+                condition=~models.Q(email=''),
+            ),
+        ]
+    
     def __str__(self):
         return self.username
     
     @property
     def is_restaurant_owner(self):
         return self.role == 'restaurant_owner'
+
+class ClaimsUser(User):
+    """
+    User built from the claims of a verified access token instead of a
+    database row. Only id, username, email and role are set, so it is used
+    for read-only requests and refuses to be saved.
+    """
+    class Meta:
+        proxy = True
+    
+    def save(self, *args, **kwargs):
+        raise TypeError("A user built from token claims cannot be saved; load the full row instead.")
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError("A user built from token claims cannot be deleted; load the full row instead.")
@@ -1,9 +1,28 @@
+from contextlib import contextmanager
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.contrib.auth.models import update_last_login
+from .hashing import hash_password
 
 User = get_user_model()
 
+@contextmanager
+def unique_email_guard():
+    """
+    Run a write in a savepoint and turn a violation of the case-insensitive
+    email index into a validation error, so the database is the only check.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if User.EMAIL_CONSTRAINT not in str(exc):
+            raise
+        raise serializers.ValidationError({"email": "A user with this email already exists."})
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     first_name = serializers.CharField(required=True)
@@ -16,18 +35,24 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'password', 'first_name', 'last_name', 'role', 'phone_number', 'address')
         read_only_fields = ('id',)
     
-    def validate_email(self, value):
-        """
-        Check that the email is not already in use.
-        """
-        user = self.context.get('request').user if self.context.get('request') else None
-        if User.objects.filter(email__iexact=value).exclude(pk=getattr(user, 'pk', None)).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-    
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        # Same as User.objects.create_user, but hashing runs on the bounded
+        # pool; the async view passes in a hash it has already awaited
+        password = validated_data.pop('password')
+        encoded = validated_data.pop('password_hash', None) or hash_password(password)
+        user = User(**validated_data)
+        user.username = User.normalize_username(user.username)
+        user.email = User.objects.normalize_email(user.email)
+        user.password = encoded
+        with unique_email_guard():
+            user.save()
         return user
+    
+    def update(self, instance, validated_data):
+        if 'password' in validated_data:
+            instance.password = hash_password(validated_data.pop('password'))
+        with unique_email_guard():
+            return super().update(instance, validated_data)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -40,3 +65,14 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['role'] = user.role
         
         return token
+    
+    @classmethod
+    def token_pair(cls, user):
+        """
+        The response body for an authenticated ``user``, as built by
+        ``validate``; used by the async login view.
+        """
+        refresh = cls.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from quickfood_backend.throttling import SlidingWindowThrottle, reset_throttles
+from restaurants.models import Restaurant
+from .authentication import LocalTTLCache, changed_key, token_cache, user_cache
+from .hashing import HashingPool
+from .models import ClaimsUser
+from .serializers import CustomTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class UniqueEmailTests(TestCase):
+    def setUp(self):
+        reset_throttles()
+        self.user = User.objects.create_user(username='alice', password='pass', email='Alice@Example.com')
+        self.client = APIClient()
+    
+    def register(self, username, email):
+        return self.client.post('/api/accounts/register/', {
+            'username': username, 'email': email, 'password': 'secret-pass',
+            'first_name': 'Test', 'last_name': 'User', 'role': 'user',
+        })
+    
+    def test_registration_rejects_email_in_other_case(self):
+        response = self.register('bob', 'alice@example.COM')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['email'], 'A user with this email already exists.')
+        self.assertFalse(User.objects.filter(username='bob').exists())
+    
+    def test_registration_with_new_email(self):
+        response = self.register('bob', 'bob@example.com')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_profile_update_keeps_own_email_and_rejects_taken_one(self):
+        User.objects.create_user(username='bob', password='pass', email='bob@example.com')
+        self.client.force_authenticate(self.user)
+        
+        response = self.client.patch('/api/accounts/profile/', {'email': 'alice@example.com'})
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.patch('/api/accounts/profile/', {'email': 'BOB@example.com'})
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'alice@example.com')
+    
+    def test_blank_emails_do_not_collide(self):
+        User.objects.create_user(username='carol', password='pass')
+        User.objects.create_user(username='dave', password='pass')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
+
+
+@override_settings(AUTH_USER_CACHE={**settings.AUTH_USER_CACHE, 'TRUST_CLAIMS': True})
+class AuthenticationCacheTests(TestCase):
+    def setUp(self):
+        reset_throttles()
+        cache.clear()
+        user_cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass', email='alice@example.com',
+                                             first_name='Alice', role='user')
+        owner = User.objects.create_user(username='owner', password='pass', role='restaurant_owner')
+        Restaurant.objects.create(owner=owner, name='Grill', description='x', address='x', phone_number='1')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token()}')
+    
+    def access_token(self):
+        return str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+    
+    def user_queries(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data)
+        return response, [q for q in queries.captured_queries if '"accounts_user"' in q['sql']]
+    
+    def test_read_requests_use_token_claims(self):
+        response, queries = self.user_queries('get', '/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+    
+    def test_process_local_cache_falls_back_to_the_full_user(self):
+        with override_settings(AUTH_USER_CACHE={**settings.AUTH_USER_CACHE, 'TRUST_CLAIMS': None}):
+            response, queries = self.user_queries('get', '/api/orders/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(queries), 1)
+            
+            # Deactivated by another process: no marker here, and its cached copy has expired
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            user_cache.clear()
+            self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+    
+    def test_full_user_is_cached_between_requests(self):
+        response, queries = self.user_queries('get', '/api/accounts/profile/')
+        self.assertEqual(response.data['first_name'], 'Alice')
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries('get', '/api/accounts/profile/')
+        self.assertEqual(response.data['first_name'], 'Alice')
+        self.assertEqual(queries, [])
+    
+    def test_profile_update_stops_trusting_older_claims(self):
+        # Restaurant owners listing ?owner=me only see their own restaurants
+        response = self.client.get('/api/restaurants/restaurant/', {'owner': 'me'})
+        self.assertEqual(len(response.data['results']), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/accounts/profile/', {'role': 'restaurant_owner'})
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/restaurants/restaurant/', {'owner': 'me'})
+        self.assertEqual(len(response.data['results']), 0)
+    
+    def test_deactivation_rejects_existing_tokens(self):
+        self.client.get('/api/accounts/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 401)
+    
+    def test_refreshed_token_does_not_outlive_the_change_marker(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        # Issued two days ago; the refresh token is still valid for five more
+        refresh['iat'] = int(time.time()) - 2 * 24 * 60 * 60
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        # The marker only lasts the access token lifetime
+        cache.delete(changed_key(self.user.id))
+        user_cache.clear()
+        
+        response = self.client.post('/api/accounts/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/orders/').status_code, 401)
+    
+    def test_token_authentication_is_cached(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/accounts/profile/')
+        self.assertEqual(response.data['username'], 'alice')
+        self.assertEqual(len(queries), 0)
+        
+        token.delete()
+        self.assertEqual(self.client.get('/api/accounts/profile/').status_code, 401)
+    
+    def test_claims_user_cannot_be_saved(self):
+        user = ClaimsUser(id=self.user.id, username='alice', role='user')
+        with self.assertRaises(TypeError):
+            user.save()
+    
+    def test_local_cache_is_bounded_and_expires(self):
+        local = LocalTTLCache(max_size=2, timeout=30)
+        for key in 'abc':
+            local.set(key, key.upper())
+        self.assertIsNone(local.get('a'))
+        self.assertEqual(local.get('c'), 'C')
+        with mock.patch('accounts.authentication.time.time', return_value=10 ** 10):
+            self.assertIsNone(local.get('c'))
+
+
+class PasswordHashingTests(TestCase):
+    REGISTRATION = {
+        'username': 'bob', 'email': 'bob@example.com', 'password': 'secret-pass',
+        'first_name': 'Bob', 'last_name': 'Builder', 'role': 'user',
+    }
+    
+    def setUp(self):
+        reset_throttles()
+        self.client = APIClient()
+    
+    def test_register_and_login_hash_on_the_pool(self):
+        with mock.patch.object(HashingPool, 'submit', autospec=True, side_effect=HashingPool.submit) as submit:
+            self.assertEqual(self.client.post('/api/accounts/register/', self.REGISTRATION).status_code, 201)
+            response = self.client.post('/api/accounts/token/', {'username': 'bob', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(submit.call_count, 2)
+        self.assertTrue(User.objects.get(username='bob').check_password('secret-pass'))
+    
+    def test_profile_password_change_is_hashed(self):
+        user = User.objects.create_user(username='bob', password='old-pass')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.patch('/api/accounts/profile/', {'password': 'new-pass'}).status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('new-pass'))
+    
+    def test_excess_logins_are_shed(self):
+        User.objects.create_user(username='bob', password='secret-pass')
+        pool = HashingPool(workers=1, max_pending=0, timeout=5)
+        release = threading.Event()
+        with mock.patch('accounts.hashing.get_pool', return_value=pool):
+            pool.submit(release.wait)
+            try:
+                response = self.client.post('/api/accounts/token/', {'username': 'bob', 'password': 'secret-pass'})
+            finally:
+                release.set()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+    
+    def test_login_attempts_are_throttled(self):
+        rates = {'user': '1000/min', 'anon': '1000/min', 'login': '2/min'}
+        with mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', rates):
+            for _ in range(2):
+                response = self.client.post('/api/accounts/token/', {'username': 'nobody', 'password': 'x'})
+                self.assertEqual(response.status_code, 401)
+            response = self.client.post('/api/accounts/token/', {'username': 'nobody', 'password': 'x'})
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            
+            response = self.client.post('/api/accounts/async/token/', {'username': 'nobody', 'password': 'x'},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 429)
+    
+    async def test_async_register_and_login(self):
+        response = await self.async_client.post('/api/accounts/async/register/', self.REGISTRATION,
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'bob')
+        
+        response = await self.async_client.post('/api/accounts/async/register/', self.REGISTRATION,
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        response = await self.async_client.post('/api/accounts/async/token/',
+                                                {'username': 'bob', 'password': 'secret-pass'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'access', 'refresh'})
+        
+        response = await self.async_client.post('/api/accounts/async/token/',
+                                                {'username': 'bob', 'password': 'wrong'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 401)
@@ -1,10 +1,13 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import RegisterView, CustomTokenObtainPairView, UserProfileView
+from .views import RegisterView, CustomTokenObtainPairView, UserProfileView, register_async, obtain_token_async
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('profile/', UserProfileView.as_view(), name='user_profile'),
+    # Async variants for the ASGI application
+    path('async/register/', register_async, name='register_async'),
+    path('async/token/', obtain_token_async, name='token_obtain_pair_async'),
 ]
\ No newline at end of file
@@ -1,7 +1,18 @@
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.response import Response
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from quickfood_backend.throttling import check_throttle
+from .authentication import CachedTokenAuthentication, CachedJWTAuthentication
+from .backends import aauthenticate
+from .hashing import PasswordHashingBusy, ahash_password
 from .serializers import UserSerializer, CustomTokenObtainPairSerializer
 
 User = get_user_model()
@@ -10,16 +21,108 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # The profile needs the full user row, not one built from token claims;
+    # saving it invalidates the cached copies (see accounts.signals)
+    authentication_classes = [CachedTokenAuthentication, CachedJWTAuthentication]
     
     def get_queryset(self):
         return User.objects.filter(pk=self.request.user.pk)
     
     def get_object(self):
         return self.request.user
+
+
+def parse_json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def busy_response(exc):
+    return JsonResponse({"detail": exc.detail}, status=exc.status_code, headers={'Retry-After': str(exc.wait)})
+
+async def throttled_response(request, scope):
+    wait = await sync_to_async(check_throttle)(request, scope)
+    if wait is None:
+        return None
+    exc = Throttled(wait)
+    return JsonResponse({"detail": exc.detail}, status=exc.status_code, headers={'Retry-After': str(wait)})
+
+@csrf_exempt
+@require_POST
+async def register_async(request):
+    """
+    Async variant of ``RegisterView`` for the ASGI application: the password
+    is hashed on the bounded pool without holding a worker thread.
+    Accepts a JSON body only.
+    """
+    throttled = await throttled_response(request, RegisterView.throttle_scope)
+    if throttled is not None:
+        return throttled
+    
+    data = parse_json_body(request)
+    if data is None:
+        return JsonResponse({"detail": "Expected a JSON object."}, status=400)
+    
+    serializer = UserSerializer(data=data, context={'request': request})
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+    
+    try:
+        password_hash = await ahash_password(serializer.validated_data['password'])
+    except PasswordHashingBusy as exc:
+        return busy_response(exc)
+    
+    try:
+        await sync_to_async(serializer.save)(password_hash=password_hash)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    return JsonResponse(serializer.data, status=201)
+
+@csrf_exempt
+@require_POST
+async def obtain_token_async(request):
+    """
+    Async variant of ``CustomTokenObtainPairView`` for the ASGI application.
+    Accepts a JSON body only.
+    """
+    throttled = await throttled_response(request, CustomTokenObtainPairView.throttle_scope)
+    if throttled is not None:
+        return throttled
+    
+    data = parse_json_body(request)
+    if data is None:
+        return JsonResponse({"detail": "Expected a JSON object."}, status=400)
+    
+    credentials = {}
+    errors = {}
+    for field in (User.USERNAME_FIELD, 'password'):
+        value = data.get(field)
+        if not isinstance(value, str) or not value:
+            errors[field] = ["This field is required."]
+        credentials[field] = value
+    if errors:
+        return JsonResponse(errors, status=400)
+    
+    try:
+        user = await aauthenticate(request, **credentials)
+    except PasswordHashingBusy as exc:
+        return busy_response(exc)
+    
+    if not jwt_settings.USER_AUTHENTICATION_RULE(user):
+        return JsonResponse({
+            "detail": CustomTokenObtainPairSerializer.default_error_messages['no_active_account'],
+            "code": "no_active_account",
+        }, status=401)
+    
+    return JsonResponse(await sync_to_async(CustomTokenObtainPairSerializer.token_pair)(user))
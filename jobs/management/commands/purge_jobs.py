@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete done and failed jobs older than JOBS["DONE_RETENTION"] / JOBS["FAILED_RETENTION"].'
+
+    def handle(self, *args, **options):
+        deleted = purge_finished_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} finished jobs.'))
@@ -0,0 +1,61 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs.queue import get_setting, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Number of worker threads (default JOBS["CONCURRENCY"]).')
+        parser.add_argument('--batch-size', type=int, help='Jobs claimed per round trip (default JOBS["BATCH_SIZE"]).')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained.')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or get_setting('CONCURRENCY')
+        batch_size = options['batch_size'] or get_setting('BATCH_SIZE')
+        poll_interval = options['poll_interval'] or get_setting('POLL_INTERVAL')
+        worker_prefix = f'{socket.gethostname()}:{os.getpid()}'
+        stop = threading.Event()
+
+        def work(index, in_thread=True):
+            worker_id = f'{worker_prefix}:{index}'
+            processed = 0
+            try:
+                while not stop.is_set():
+                    ran = run_pending_jobs(worker_id, batch_size=batch_size)
+                    processed += ran
+                    if not ran:
+                        if options['once']:
+                            break
+                        stop.wait(poll_interval)
+            finally:
+                if in_thread:
+                    # Each pool thread opened its own database connection
+                    connection.close()
+            return processed
+
+        if concurrency == 1:
+            # No thread pool needed for a single worker
+            total = work(0, in_thread=False)
+            self.stdout.write(self.style.SUCCESS(f'Processed {total} jobs.'))
+            return
+
+        self.stdout.write(f'Starting {concurrency} job worker thread(s).')
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(work, index) for index in range(concurrency)]
+            try:
+                while not all(future.done() for future in futures):
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                stop.set()
+        total = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} jobs.'))
@@ -0,0 +1,170 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CONCURRENCY': 4,
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5,
+    'BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 300,
+    'DONE_RETENTION': 7 * 24 * 3600,
+    'FAILED_RETENTION': 30 * 24 * 3600,
+}
+
+_registry = {}
+
+
+class LostClaim(Exception):
+    """
+    The job's claim went stale and another worker took the job over.
+    """
+
+
+def get_setting(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def job(name):
+    """
+    Register a handler for jobs called ``name``. Handlers receive the job's
+    payload as keyword arguments and run inside a transaction together with
+    marking the job done, so a failed attempt leaves no partial writes.
+    """
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """
+    Queue a job. Called inside a transaction, the job only becomes visible
+    to workers once that transaction commits.
+    """
+    if name not in _registry:
+        raise ValueError(f"No job handler registered for '{name}'.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or get_setting('MAX_ATTEMPTS'),
+    )
+
+
+def backoff_delay(attempts):
+    """
+    Exponential backoff with jitter for the given number of failed attempts.
+    """
+    delay = min(get_setting('BACKOFF_BASE') * 2 ** (attempts - 1), get_setting('BACKOFF_MAX'))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_jobs(worker_id, limit):
+    """
+    Mark up to ``limit`` due jobs as running for ``worker_id`` and return them.
+
+    On PostgreSQL candidates are selected with FOR UPDATE SKIP LOCKED so
+    concurrent workers never wait on each other. The claim itself is a
+    conditional UPDATE, which keeps it safe on SQLite where row locks are not
+    available.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=get_setting('LOCK_TIMEOUT'))
+    due = Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+    
+    with transaction.atomic():
+        candidates = Job.objects.filter(due).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        job_ids = list(candidates.values_list('id', flat=True)[:limit])
+        if not job_ids:
+            return []
+        
+        Job.objects.filter(due, id__in=job_ids).update(
+            status='running', locked_at=now, locked_by=worker_id, attempts=F('attempts') + 1
+        )
+    
+    return list(Job.objects.filter(id__in=job_ids, status='running', locked_by=worker_id, locked_at=now))
+
+
+def run_job(claimed):
+    """
+    Run one claimed job and record the outcome. Returns True on success.
+    
+    Outcomes are only recorded while the claim is still ours: if the job was
+    reclaimed as stale in the meantime, the handler's writes are rolled back
+    and the job is left to the worker that holds it now.
+    """
+    handler = _registry.get(claimed.name)
+    ours = Job.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by, locked_at=claimed.locked_at)
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for '{claimed.name}'.")
+        with transaction.atomic():
+            handler(**claimed.payload)
+            if not ours.update(status='done', locked_at=None, last_error='', updated_at=timezone.now()):
+                raise LostClaim()
+        return True
+    except LostClaim:
+        logger.warning("Job %s #%s was reclaimed before it finished; discarding this run", claimed.name, claimed.pk)
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s #%s failed (attempt %s)", claimed.name, claimed.pk, claimed.attempts)
+        if claimed.attempts >= claimed.max_attempts:
+            changes = {'status': 'failed'}
+        else:
+            changes = {'status': 'queued', 'run_at': timezone.now() + backoff_delay(claimed.attempts)}
+        ours.update(locked_at=None, last_error=error, updated_at=timezone.now(), **changes)
+        return False
+
+
+def run_pending_jobs(worker_id='inline', batch_size=None, max_jobs=None):
+    """
+    Claim and run due jobs until none are left (or ``max_jobs`` have run).
+    Returns the number of jobs run.
+    """
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        limit = batch_size if max_jobs is None else min(batch_size, max_jobs - processed)
+        claimed = claim_jobs(worker_id, limit)
+        if not claimed:
+            break
+        for claimed_job in claimed:
+            run_job(claimed_job)
+            processed += 1
+    return processed
+
+
+def purge_finished_jobs(batch_size=1000):
+    """
+    Delete ``done`` jobs older than ``DONE_RETENTION`` and ``failed`` jobs
+    older than ``FAILED_RETENTION`` (both in seconds, measured from the last
+    update). Rows are deleted in batches to keep each statement short.
+    Returns the number removed.
+    """
+    now = timezone.now()
+    finished = (
+        Q(status='done', updated_at__lt=now - timedelta(seconds=get_setting('DONE_RETENTION')))
+        | Q(status='failed', updated_at__lt=now - timedelta(seconds=get_setting('FAILED_RETENTION')))
+    )
+    deleted = 0
+    while True:
+        job_ids = list(Job.objects.filter(finished).values_list('id', flat=True)[:batch_size])
+        if not job_ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=job_ids).delete()[0]
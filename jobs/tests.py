@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_jobs, enqueue, job, purge_finished_jobs, run_job, run_pending_jobs
+
+calls = []
+
+
+@job('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('jobs.tests.explode')
+def explode():
+    Job.objects.create(name='side-effect')
+    raise RuntimeError('boom')
+
+
+@job('jobs.tests.write')
+def write():
+    Job.objects.create(name='side-effect')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_once_and_are_marked_done(self):
+        first = enqueue('jobs.tests.record', {'value': 1})
+        second = enqueue('jobs.tests.record', {'value': 2})
+        self.assertEqual(run_pending_jobs(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'done'})
+        self.assertEqual(run_pending_jobs(), 0)
+        self.assertEqual(Job.objects.get(pk=first.pk).attempts, 1)
+        self.assertEqual(Job.objects.get(pk=second.pk).attempts, 1)
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        failing = enqueue('jobs.tests.explode', max_attempts=2)
+        with self.assertLogs('jobs.queue', level='ERROR'):
+            run_pending_jobs()
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, 'queued')
+        self.assertGreater(failing.run_at, timezone.now())
+        self.assertIn('boom', failing.last_error)
+        # The handler's own writes were rolled back with the failed attempt
+        self.assertFalse(Job.objects.filter(name='side-effect').exists())
+
+        Job.objects.filter(pk=failing.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', level='ERROR'):
+            run_pending_jobs()
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, 'failed')
+        self.assertEqual(failing.attempts, 2)
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        enqueue('jobs.tests.record', {'value': 1})
+        self.assertEqual(len(claim_jobs('worker-a', 10)), 1)
+        self.assertEqual(claim_jobs('worker-b', 10), [])
+
+    def test_reclaimed_job_discards_the_stale_run(self):
+        enqueue('jobs.tests.write')
+        [claimed] = claim_jobs('worker-a', 10)
+        # The claim went stale and was taken again, here by a worker reusing the same id
+        Job.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() + timezone.timedelta(seconds=1))
+        with self.assertLogs('jobs.queue', level='WARNING'):
+            self.assertFalse(run_job(claimed))
+        self.assertEqual(Job.objects.get(pk=claimed.pk).status, 'running')
+        self.assertFalse(Job.objects.filter(name='side-effect').exists())
+
+    def test_future_jobs_wait(self):
+        enqueue('jobs.tests.record', {'value': 1}, run_at=timezone.now() + timezone.timedelta(minutes=5))
+        self.assertEqual(run_pending_jobs(), 0)
+
+    def test_unknown_job_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('jobs.tests.missing')
+
+    def test_worker_command_drains_queue(self):
+        enqueue('jobs.tests.record', {'value': 3})
+        call_command('run_jobs', '--once', '--concurrency', '1', stdout=StringIO())
+        self.assertEqual(calls, [3])
+
+    def test_purge_removes_finished_jobs_past_retention(self):
+        old = timezone.now() - timezone.timedelta(days=10)
+        ancient = timezone.now() - timezone.timedelta(days=40)
+        Job.objects.create(name='done-old', status='done')
+        Job.objects.create(name='done-new', status='done')
+        Job.objects.create(name='failed-old', status='failed')
+        Job.objects.create(name='failed-ancient', status='failed')
+        Job.objects.create(name='queued-old', status='queued')
+        Job.objects.filter(name__in=['done-old', 'failed-old', 'queued-old']).update(updated_at=old)
+        Job.objects.filter(name='failed-ancient').update(updated_at=ancient)
+
+        self.assertEqual(purge_finished_jobs(batch_size=1), 2)
+        self.assertEqual(
+            set(Job.objects.values_list('name', flat=True)),
+            {'done-new', 'failed-old', 'queued-old'},
+        )
+
+        out = StringIO()
+        call_command('purge_jobs', stdout=out)
+        self.assertIn('Deleted 0 finished jobs.', out.getvalue())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -17,3 +17,14 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'menu_item', 'quantity', 'price')
     list_filter = ('order__status',)
     search_fields = ('order__id', 'menu_item__name')
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'restaurant', 'status', 'total_price', 'created_at', 'archived_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'restaurant__name')
+    inlines = [ArchivedOrderItemInline]
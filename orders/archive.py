@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+
+def get_archive_after():
+    return getattr(settings, 'ORDER_ARCHIVE_AFTER', timedelta(days=90))
+
+
+def get_batch_size():
+    return getattr(settings, 'ORDER_ARCHIVE_BATCH_SIZE', 500)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to ``batch_size`` terminal orders last updated before ``cutoff``
+    (and their items) into the archive tables. Returns the number moved.
+    """
+    with transaction.atomic():
+        candidates = Order.objects.filter(
+            status__in=Order.TERMINAL_STATUSES,
+            updated_at__lt=cutoff,
+        ).order_by('updated_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            # Let several archivers run side by side without blocking each other
+            candidates = candidates.select_for_update(skip_locked=True)
+        orders = list(candidates[:batch_size])
+        if not orders:
+            return 0
+        
+        order_ids = [order.id for order in orders]
+        items = list(OrderItem.objects.filter(order_id__in=order_ids))
+        
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                restaurant_id=order.restaurant_id,
+                status=order.status,
+                total_price=order.total_price,
+                delivery_address=order.delivery_address,
+                created_at=order.created_at,
+                updated_at=order.updated_at,
+            )
+            for order in orders
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                id=item.id,
+                order_id=item.order_id,
+                menu_item_id=item.menu_item_id,
+                quantity=item.quantity,
+                price=item.price,
+            )
+            for item in items
+        ])
+        
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+        return len(orders)
+
+
+def archive_orders(older_than=None, batch_size=None, max_batches=None):
+    """
+    Archive finished orders in bounded batches, each in its own transaction,
+    so locks are short-lived. Returns the total number of orders moved.
+    """
+    cutoff = timezone.now() - (older_than if older_than is not None else get_archive_after())
+    batch_size = batch_size or get_batch_size()
+    
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        batches += 1
+        if moved < batch_size:
+            break
+    return total
@@ -0,0 +1,249 @@
+"""
+Benchmark harness for the API hot paths.
+
+``seed_dataset`` writes a deterministic dataset (see ``orders.seeding``) and
+``run_benchmark`` drives the real endpoints in-process, through Django's test
+client or its ASGI client, recording per-request latency plus the query count
+and DB/serializer time reported by RequestMetricsMiddleware. The
+``benchmark`` management command runs both against a throwaway database and
+writes the report as JSON, so results can be diffed between commits.
+"""
+import asyncio
+import json
+import logging
+import math
+import random
+import statistics
+import time
+from collections import deque
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+
+from accounts.serializers import CustomTokenObtainPairSerializer
+from quickfood_backend.middleware import logger as request_logger
+from quickfood_backend.throttling import SlidingWindowThrottle, reset_throttles
+from restaurants.models import MenuItem, Restaurant
+from .models import Order
+from .seeding import PASSWORD, seed as seed_data
+
+User = get_user_model()
+
+# Keeps enough orders in progress for the status update scenario
+ACTIVE_FRACTION = 0.5
+
+
+def seed_dataset(restaurants=50, menu_items=20, users=200, orders=2000, seed=1):
+    """
+    Seed the benchmark dataset; returns the number of rows created per kind.
+    """
+    return seed_data(restaurants=restaurants, menu_items=menu_items, users=users, orders=orders, days=30,
+                     seed=seed, prefix='bench', active_fraction=ACTIVE_FRACTION)
+
+
+def clear_dataset():
+    """
+    Empty every table of the current database, so a kept benchmark database
+    can be seeded again without colliding with the previous run's rows.
+    """
+    call_command('flush', interactive=False, verbosity=0)
+
+
+class MetricsCollector(logging.Handler):
+    """
+    Keeps the fields of the last record RequestMetricsMiddleware logged.
+    """
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.last = None
+    
+    def emit(self, record):
+        self.last = record
+
+
+class Scenarios:
+    """
+    Builds the request for one iteration of each scenario from the seeded
+    data. Each returns ``(method, path, data, headers)``.
+    """
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.tokens = {}
+        self.restaurant_ids = list(Restaurant.objects.order_by('id').values_list('id', flat=True))
+        self.customer_ids = list(User.objects.filter(role='user').order_by('id').values_list('id', flat=True))
+        self.menus = {}
+        for item_id, restaurant_id in (MenuItem.objects.filter(is_available=True).order_by('id')
+                                       .values_list('id', 'restaurant_id')):
+            self.menus.setdefault(restaurant_id, []).append(item_id)
+        # Orders to walk through their statuses, one step per request
+        self.transitions = deque(
+            (order_id, owner_id, 'preparing')
+            for order_id, owner_id in (Order.objects.filter(status='pending').order_by('id')
+                                       .values_list('id', 'restaurant__owner_id'))
+        )
+        self.usernames = dict(User.objects.filter(pk__in=self.customer_ids).values_list('id', 'username'))
+    
+    def auth(self, user_id):
+        if user_id not in self.tokens:
+            token = CustomTokenObtainPairSerializer.get_token(User.objects.get(pk=user_id)).access_token
+            self.tokens[user_id] = {'Authorization': f'Bearer {token}'}
+        return self.tokens[user_id]
+    
+    def restaurant_list(self):
+        return 'get', '/api/restaurants/restaurant/', None, {}
+    
+    def restaurant_menu(self):
+        return 'get', f'/api/restaurants/restaurant/{self.rng.choice(self.restaurant_ids)}/menu/', None, {}
+    
+    def order_create(self):
+        restaurant_id = self.rng.choice(list(self.menus))
+        items = self.rng.sample(self.menus[restaurant_id], min(3, len(self.menus[restaurant_id])))
+        data = {
+            'restaurant': restaurant_id,
+            'delivery_address': '1 Benchmark Ave',
+            'order_items': [{'menu_item': item_id, 'quantity': self.rng.randint(1, 3)} for item_id in items],
+        }
+        return 'post', '/api/orders/', data, self.auth(self.rng.choice(self.customer_ids))
+    
+    def order_list(self):
+        return 'get', '/api/orders/', None, self.auth(self.rng.choice(self.customer_ids))
+    
+    def order_status_update(self):
+        if not self.transitions:
+            raise ValueError('Every seeded pending order has been delivered; seed more orders.')
+        order_id, owner_id, next_status = self.transitions.popleft()
+        following = Order.STATUS_TRANSITIONS[next_status]
+        if following:
+            self.transitions.append((order_id, owner_id, following[0]))
+        return 'patch', f'/api/orders/{order_id}/update_status/', {'status': next_status}, self.auth(owner_id)
+    
+    def login(self):
+        username = self.usernames[self.rng.choice(self.customer_ids)]
+        return 'post', '/api/accounts/token/', {'username': username, 'password': PASSWORD}, {}
+
+
+SCENARIOS = ('restaurant_list', 'restaurant_menu', 'order_create', 'order_list', 'order_status_update', 'login')
+
+
+def percentile(ordered, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Samples:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.db_times = []
+        self.serializer_times = []
+        self.errors = 0
+    
+    def add(self, elapsed, response, record):
+        self.latencies.append(elapsed * 1000)
+        self.queries.append(record.queries)
+        self.db_times.append(record.db_ms)
+        self.serializer_times.append(record.serializer_ms)
+        if response.status_code >= 400:
+            self.errors += 1
+    
+    def summary(self):
+        ordered = sorted(self.latencies)
+        return {
+            'requests': len(ordered),
+            'errors': self.errors,
+            # Requests are sequential, so throughput is the inverse of the mean latency
+            'throughput_rps': round(1000 * len(ordered) / sum(ordered), 2),
+            'latency_ms': {
+                'mean': round(statistics.fmean(ordered), 3),
+                'p50': round(percentile(ordered, 50), 3),
+                'p95': round(percentile(ordered, 95), 3),
+                'p99': round(percentile(ordered, 99), 3),
+                'max': round(ordered[-1], 3),
+            },
+            'queries_per_request': {
+                'mean': round(statistics.fmean(self.queries), 2),
+                'max': max(self.queries),
+            },
+            'db_ms_mean': round(statistics.fmean(self.db_times), 3),
+            'serializer_ms_mean': round(statistics.fmean(self.serializer_times), 3),
+        }
+
+
+def unthrottled_rates():
+    # Keep the throttles' cost in the measurements without ever limiting
+    return {scope: '1000000/s' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+
+
+def run_benchmark(scenarios=SCENARIOS, requests=200, warmup=10, client='sync', seed=1):
+    """
+    Run each scenario for ``warmup`` unrecorded and then ``requests``
+    recorded requests against the current database, one at a time, and
+    return the summary per scenario. Responses with status 400 or above
+    are counted as errors.
+    """
+    builder = Scenarios(seed)
+    collector = MetricsCollector()
+    metrics_settings = {**getattr(settings, 'REQUEST_METRICS', {}),
+                        'ENABLED': True, 'SERVER_TIMING': False, 'PROFILE_SAMPLE_RATE': 0}
+    handlers, level = request_logger.handlers, request_logger.level
+    request_logger.handlers = [collector]
+    request_logger.setLevel(logging.INFO)
+    results = {}
+    try:
+        with override_settings(REQUEST_METRICS=metrics_settings), \
+                mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', unthrottled_rates()):
+            reset_throttles()
+            for name in scenarios:
+                build = getattr(builder, name)
+                if client == 'asgi':
+                    results[name] = asyncio.run(run_scenario_async(build, collector, requests, warmup))
+                else:
+                    results[name] = run_scenario(build, collector, requests, warmup)
+    finally:
+        request_logger.handlers = handlers
+        request_logger.setLevel(level)
+    return results
+
+
+def run_scenario(build, collector, requests, warmup):
+    client = Client(raise_request_exception=False)
+    samples = Samples()
+    for i in range(warmup + requests):
+        method, path, data, headers = build()
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data, content_type='application/json', headers=headers)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.add(elapsed, response, collector.last)
+    return samples.summary()
+
+
+async def run_scenario_async(build, collector, requests, warmup):
+    client = AsyncClient(raise_request_exception=False)
+    samples = Samples()
+    for i in range(warmup + requests):
+        # Building the request reads the database
+        method, path, data, headers = await sync_to_async(build)()
+        start = time.perf_counter()
+        response = await getattr(client, method)(path, data, content_type='application/json', headers=headers)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.add(elapsed, response, collector.last)
+    return samples.summary()
+
+
+def write_report(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def database_description():
+    return {'vendor': connection.vendor, 'version': '.'.join(map(str, connection.get_database_version()))}
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'orders.events.InMemoryBackend',
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_INTERVAL': 15,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ORDER_EVENTS', {}).get(name, DEFAULTS[name])
+
+
+class InMemoryBackend:
+    """
+    Fan-out within a single process.
+
+    Publishers may run in any thread (sync views run in a thread pool under
+    ASGI), so messages are handed to each subscriber's event loop with
+    call_soon_threadsafe. A subscriber whose queue is full misses the message
+    rather than blocking the publisher.
+    """
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, loop, queue):
+        with self._lock:
+            self._subscribers[channel].add((loop, queue))
+
+    def unsubscribe(self, channel, loop, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None:
+                return
+            subscribers.discard((loop, queue))
+            if not subscribers:
+                del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has already shut down
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+class Subscription:
+    """
+    A single listener's queue on a channel. Must be created inside the event
+    loop that will consume it.
+    """
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=get_setting('QUEUE_SIZE'))
+        self.backend.subscribe(self.channel, self.loop, self.queue)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.backend.unsubscribe(self.channel, self.loop, self.queue)
+
+
+class OrderEventBroker:
+    """
+    Publishes order events to per-user channels through a pluggable backend.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def channel_for(user_id):
+        return f'user:{user_id}'
+
+    def publish(self, user_ids, event, data):
+        message = (event, json.dumps(data, default=str))
+        for user_id in set(user_ids):
+            self.backend.publish(self.channel_for(user_id), message)
+
+    def subscribe(self, user_id):
+        return Subscription(self.backend, self.channel_for(user_id))
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return OrderEventBroker(import_string(get_setting('BACKEND'))())
+
+
+def publish_order_status(order, restaurant_owner_id):
+    """
+    Notify the customer and the restaurant owner of an order's new status
+    once the surrounding transaction (if any) commits.
+    """
+    transaction.on_commit(lambda: get_broker().publish(
+        [order.user_id, restaurant_owner_id],
+        'order_status',
+        {
+            'id': order.id,
+            'restaurant': order.restaurant_id,
+            'status': order.status,
+            'updated_at': order.updated_at,
+        },
+    ))
@@ -0,0 +1,116 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def get_lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', timedelta(seconds=60))
+
+
+def purge_expired_keys():
+    """
+    Delete stored results older than the TTL. Returns the number removed.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - get_ttl()).delete()
+    return deleted
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    Makes ``create`` safe to retry with an ``Idempotency-Key`` header.
+
+    The first request claims the key with an INSERT guarded by a unique
+    constraint, so concurrent duplicates are collapsed onto a single worker;
+    the others get 409 until the result is stored. Successful responses are
+    replayed verbatim for the TTL without touching any other table. Failed
+    requests release the key so the client can retry.
+    """
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        
+        if len(key) > 255:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} must be at most 255 characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fingerprint = request_fingerprint(request)
+        claim, existing = self.claim_idempotency_key(request.user, key, fingerprint)
+        if existing is not None:
+            return self.replay_idempotent_response(existing, fingerprint)
+        
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            claim.delete()
+            raise
+        
+        if status.is_success(response.status_code):
+            claim.status_code = response.status_code
+            claim.response_body = json.loads(json.dumps(response.data, default=str))
+            claim.save(update_fields=['status_code', 'response_body'])
+        else:
+            claim.delete()
+        return response
+    
+    def claim_idempotency_key(self, user, key, fingerprint):
+        """
+        Return ``(claim, None)`` when this request owns the key, or
+        ``(None, existing)`` when another request already does.
+        """
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(user=user, key=key, request_hash=fingerprint), None
+            except IntegrityError:
+                existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+                if existing is None:
+                    continue
+                
+                now = timezone.now()
+                expired = existing.created_at < now - get_ttl()
+                abandoned = existing.status_code is None and existing.created_at < now - get_lock_timeout()
+                if not (expired or abandoned):
+                    return None, existing
+                
+                # Evict the stale row and try to claim the key again
+                IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+        
+        return None, IdempotencyKey.objects.get(user=user, key=key)
+    
+    def replay_idempotent_response(self, existing, fingerprint):
+        if existing.request_hash != fingerprint:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} was already used with a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        
+        if existing.status_code is None:
+            return Response(
+                {"detail": "A request with this idempotency key is still being processed."},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': '1'}
+            )
+        
+        return Response(existing.response_body, status=existing.status_code, headers={'Idempotent-Replayed': 'true'})
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled orders older than ORDER_ARCHIVE_AFTER into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help='Override ORDER_ARCHIVE_AFTER.')
+        parser.add_argument('--batch-size', type=int, help='Override ORDER_ARCHIVE_BATCH_SIZE.')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches.')
+
+    def handle(self, *args, **options):
+        older_than = None
+        if options['older_than_days'] is not None:
+            older_than = timedelta(days=options['older_than_days'])
+        
+        moved = archive_orders(
+            older_than=older_than,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} orders.'))
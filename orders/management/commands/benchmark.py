@@ -0,0 +1,90 @@
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from orders.benchmark import (
+    SCENARIOS, clear_dataset, database_description, run_benchmark, seed_dataset, write_report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database, drive the API hot paths in-process and write throughput, '
+        'latency percentiles and queries per request for each scenario as JSON.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=50)
+        parser.add_argument('--menu-items', type=int, default=20, help='Menu items per restaurant.')
+        parser.add_argument('--users', type=int, default=200, help='Customer accounts.')
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200, help='Recorded requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10, help='Unrecorded requests before each scenario.')
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+            help='Only run the given scenario (may be repeated).',
+        )
+        parser.add_argument('--client', choices=('sync', 'asgi'), default='sync',
+                            help='Drive requests through the WSGI test client or the ASGI client.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the data and the requests.')
+        parser.add_argument('--output', default='benchmark.json', help='Where to write the JSON report.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database schema between runs; its rows are replaced each run.')
+    
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        
+        # The test database is created from the configured one (SQLite or
+        # PostgreSQL), so the real data is never touched
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            if options['keepdb']:
+                # Rows left by the previous run would collide with the seeded names
+                clear_dataset()
+            start = time.perf_counter()
+            dataset = seed_dataset(
+                restaurants=options['restaurants'], menu_items=options['menu_items'],
+                users=options['users'], orders=options['orders'], seed=options['seed'],
+            )
+            self.stdout.write(f'Seeded {dataset} in {time.perf_counter() - start:.1f}s.')
+            
+            results = run_benchmark(
+                scenarios=options['scenarios'] or SCENARIOS, requests=options['requests'],
+                warmup=options['warmup'], client=options['client'], seed=options['seed'],
+            )
+            report = {
+                'commit': self.git_commit(),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'database': database_description(),
+                'client': options['client'],
+                'seed': options['seed'],
+                'dataset': dataset,
+                'scenarios': results,
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+        
+        write_report(options['output'], report)
+        for name, result in results.items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{name:<22} {result['throughput_rps']:>9.1f} req/s  p50 {latency['p50']:>8.2f}ms  "
+                f"p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+                f"{result['queries_per_request']['mean']:>5.1f} queries  {result['errors']} errors"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}."))
+    
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from orders.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the daily restaurant and menu item sales rollups from order history. '
+        'Run it while the job queue is drained, since queued rollup jobs are applied on top.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurant_ids',
+            help='Only rebuild the given restaurant ID (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        rebuild_stats(options['restaurant_ids'])
+        self.stdout.write(self.style.SUCCESS('Sales stats rebuilt.'))
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.seeding import DEFAULT_BATCH_SIZE, PASSWORD, seed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with deterministic synthetic users, restaurants, menu items and orders for '
+        'load testing. Rows are streamed in batches with bulk_create, or COPY on PostgreSQL.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--menu-items', type=int, default=50, help='Menu items per restaurant.')
+        parser.add_argument('--users', type=int, default=1000, help='Customer accounts.')
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=90, help='Spread orders over this many past days.')
+        parser.add_argument('--active-fraction', type=float, default=0.02,
+                            help='Share of orders that are recent and still in progress.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--prefix', default='seed',
+                            help='Prefix of usernames and restaurant names, to seed more than once.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--no-stats', action='store_false', dest='stats',
+                            help='Skip rebuilding the sales rollups (run rebuild_sales_stats later).')
+        parser.add_argument('--no-copy', action='store_false', dest='use_copy', default=None,
+                            help='Use bulk_create even on PostgreSQL.')
+    
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if not 0 <= options['active_fraction'] <= 1:
+            raise CommandError('--active-fraction must be between 0 and 1.')
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Data with prefix {options['prefix']!r} already exists; pass another --prefix.")
+        
+        def progress(label, done):
+            if self.verbosity > 1:
+                self.stdout.write(f'{label}: {done}')
+        
+        self.verbosity = options['verbosity']
+        start = time.perf_counter()
+        try:
+            counts = seed(
+                restaurants=options['restaurants'], menu_items=options['menu_items'], users=options['users'],
+                orders=options['orders'], days=options['days'], seed=options['seed'], prefix=options['prefix'],
+                active_fraction=options['active_fraction'], batch_size=options['batch_size'],
+                use_copy=options['use_copy'], stats=options['stats'], progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        
+        summary = ', '.join(f'{count} {label.replace("_", " ")}' for label, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {summary} in {time.perf_counter() - start:.1f}s. Every password is {PASSWORD!r}.'
+        ))
@@ -11,6 +11,17 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
+    TERMINAL_STATUSES = ('delivered', 'cancelled')
+    
+    # Allowed moves between statuses; delivered and cancelled are terminal
+    STATUS_TRANSITIONS = {
+        'pending': ('preparing', 'cancelled'),
+        'preparing': ('out_for_delivery', 'cancelled'),
+        'out_for_delivery': ('delivered',),
+        'delivered': (),
+        'cancelled': (),
+    }
+    
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -20,10 +31,26 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['restaurant', '-created_at'], name='order_restaurant_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
+    
+    @classmethod
+    def can_transition(cls, from_status, to_status):
+        return to_status in cls.STATUS_TRANSITIONS.get(from_status, ())
+    
+    @classmethod
+    def source_statuses(cls, to_status):
+        """
+        Statuses an order may be in for a move to ``to_status`` to be allowed.
+        """
+        return [from_status for from_status, targets in cls.STATUS_TRANSITIONS.items() if to_status in targets]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -39,3 +66,104 @@ class OrderItem(models.Model):
         if not self.price:
             self.price = self.menu_item.price
         super().save(*args, **kwargs)
+
+class ArchivedOrder(models.Model):
+    """
+    Finished order moved out of the live Order table by the archive_orders
+    command. Keeps the original order ID.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    delivery_address = models.TextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+            models.Index(fields=['restaurant', '-created_at'], name='archived_rest_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived order #{self.id}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='archived_order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_id}"
+
+class RestaurantDailyStats(models.Model):
+    """
+    Per-restaurant, per-day sales rollup maintained as orders are placed and
+    change status. Revenue excludes cancelled orders.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    order_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date'], name='unique_restaurant_daily_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.date}"
+
+class MenuItemDailyStats(models.Model):
+    """
+    Per-menu-item, per-day quantities sold, excluding cancelled orders.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_item_daily_stats')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'date'], name='unique_menu_item_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurant', 'date'], name='menuitem_stats_rest_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.menu_item_id} on {self.date}"
+
+class IdempotencyKey(models.Model):
+    """
+    Result of a request made with an ``Idempotency-Key`` header, stored per
+    user so retries can be answered without redoing the work. A row without
+    a ``status_code`` is a claim held by a request still in progress.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
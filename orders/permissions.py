@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from restaurants.permissions import owns_restaurant_of
 
 class IsOrderOwnerOrRestaurantOwner(permissions.BasePermission):
     """
@@ -6,11 +7,8 @@ class IsOrderOwnerOrRestaurantOwner(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Check if user is the order owner
-        if obj.user == request.user:
+        if obj.user_id == request.user.id:
             return True
         
         # Check if user is the restaurant owner
-        if request.user.role == 'restaurant_owner' and obj.restaurant.owner == request.user:
-            return True
-        
-        return False
\ No newline at end of file
+        return owns_restaurant_of(request, obj)
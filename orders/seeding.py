@@ -0,0 +1,295 @@
+"""
+Synthetic data for load tests and for reproducing problems at production
+volumes.
+
+``seed`` streams generated users, restaurants, menu items, orders and order
+items into the database in fixed-size batches, so memory stays bounded
+however many rows are requested: only the ids and prices later rows refer to
+are kept, in compact arrays. Batches go through ``bulk_create``, or through
+``COPY ... FROM STDIN`` on PostgreSQL. The same seed always produces the same
+rows. Timestamps are relative to the time of the run.
+"""
+import io
+import json
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from restaurants.models import MenuItem, Restaurant
+from restaurants.search import index_instances
+from .models import Order, OrderItem
+from .stats import rebuild_stats
+
+User = get_user_model()
+
+PASSWORD = 'seed-password'
+DEFAULT_BATCH_SIZE = 5000
+RESTAURANTS_PER_OWNER = 5
+
+# Unfinished orders were placed within this long before the run
+ACTIVE_WINDOW = timedelta(hours=1)
+ACTIVE_STATUS_WEIGHTS = {'pending': 3, 'preparing': 2, 'out_for_delivery': 1}
+CANCELLED_SHARE = 0.07
+
+# Restaurant coordinates spread over roughly a city around this point
+CENTER = (40.73, -73.99)
+SPREAD_DEGREES = 0.15
+
+ADJECTIVES = ['Golden', 'Spicy', 'Little', 'Green', 'Blue', 'Happy', 'Royal', 'Urban', 'Rustic', 'Lucky']
+KITCHENS = ['Noodle House', 'Grill', 'Bistro', 'Taqueria', 'Curry Corner', 'Pizzeria', 'Sushi Bar', 'Diner',
+            'Kebab Shop', 'Bakery']
+DISHES = ['Burger', 'Ramen', 'Burrito', 'Pad Thai', 'Margherita', 'Falafel Wrap', 'Caesar Salad', 'Pho',
+          'Fried Rice', 'Tikka Masala', 'Club Sandwich', 'Poke Bowl']
+STREETS = ['Main St', 'Oak Ave', 'Pine St', 'Maple Ave', 'Cedar Rd', 'Elm St', 'Park Ave', 'Lake Rd']
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Save ``auto_now``/``auto_now_add`` fields of ``models`` as set on the
+    instances instead of the current time.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class BulkCreateWriter:
+    def write(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=len(objs))
+    
+    def finish(self, models):
+        pass
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class CopyWriter:
+    """
+    Loads batches with PostgreSQL's ``COPY ... FROM STDIN``. Primary keys are
+    drawn from the table's sequence first, since COPY cannot return them.
+    """
+    def write(self, model, objs):
+        fields = model._meta.concrete_fields
+        table = model._meta.db_table
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [table, model._meta.pk.column, len(objs)],
+            )
+            for obj, (pk,) in zip(objs, cursor.fetchall()):
+                obj.pk = pk
+            
+            buffer = io.StringIO()
+            for obj in objs:
+                buffer.write('\t'.join(copy_value(field.get_prep_value(getattr(obj, field.attname)))
+                                       for field in fields))
+                buffer.write('\n')
+            sql = f"COPY {quote(table)} ({', '.join(quote(field.column) for field in fields)}) FROM STDIN"
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        return objs
+    
+    def finish(self, models):
+        # Give the planner statistics for the new rows
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def get_writer(use_copy=None):
+    """
+    COPY on PostgreSQL unless ``use_copy`` is False, otherwise bulk_create.
+    """
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    if use_copy and connection.vendor != 'postgresql':
+        raise ValueError('COPY is only available on PostgreSQL.')
+    return CopyWriter() if use_copy else BulkCreateWriter()
+
+
+def address(rng):
+    return f'{rng.randint(1, 999)} {rng.choice(STREETS)}'
+
+
+def cents(value):
+    return Decimal(value).scaleb(-2)
+
+
+def seed(restaurants, menu_items, users, orders, days=90, seed=1, prefix='seed', active_fraction=0.02,
+         batch_size=DEFAULT_BATCH_SIZE, use_copy=None, stats=True, progress=None):
+    """
+    Create ``restaurants`` restaurants with ``menu_items`` items each, an
+    owner per RESTAURANTS_PER_OWNER restaurants, ``users`` customers and
+    ``orders`` orders of one to three items spread over the last ``days``
+    days. A ``active_fraction`` share of orders were placed within
+    ACTIVE_WINDOW and are still in progress; the rest were delivered or
+    cancelled. Popular restaurants get more orders. Usernames, emails and
+    restaurant names contain ``prefix``; every password is PASSWORD. The
+    sales rollups are rebuilt afterwards unless ``stats`` is false.
+    
+    ``progress(label, done)`` is called after each batch. Returns the number
+    of rows created per kind.
+    """
+    if orders and not (restaurants and menu_items and users):
+        raise ValueError('Orders need restaurants, menu items and users.')
+    
+    now = timezone.now()
+    start = now - timedelta(days=days)
+    writer = get_writer(use_copy)
+    password = make_password(PASSWORD)
+    counts = {}
+    
+    def load(label, model, objs, index=False):
+        done = 0
+        for batch in batches(objs, batch_size):
+            with transaction.atomic():
+                batch = writer.write(model, batch)
+                if index:
+                    # Bulk inserts send no signals, so refresh the search index here
+                    index_instances(model, batch)
+            done += len(batch)
+            if progress:
+                progress(label, done)
+            yield from batch
+        counts[label] = done
+    
+    def people(label, count, role):
+        rng = random.Random(f'{seed}-{label}')
+        for i in range(count):
+            joined = start - timedelta(days=rng.randint(0, 365))
+            yield User(
+                username=f'{prefix}-{label[:-1]}-{i}', email=f'{prefix}-{label[:-1]}-{i}@example.com',
+                first_name=rng.choice(ADJECTIVES), role=role, password=password, address=address(rng),
+                date_joined=joined,
+            )
+    
+    with explicit_timestamps(Restaurant, MenuItem, Order):
+        owner_ids = array('q', (user.pk for user in load(
+            'owners', User, people('owners', -(-restaurants // RESTAURANTS_PER_OWNER), 'restaurant_owner'))))
+        customer_ids = array('q')
+        customer_addresses = []
+        for user in load('customers', User, people('customers', users, 'user')):
+            customer_ids.append(user.pk)
+            customer_addresses.append(user.address)
+        
+        def restaurant_rows():
+            rng = random.Random(f'{seed}-restaurants')
+            for i in range(restaurants):
+                restaurant = Restaurant(
+                    owner_id=owner_ids[i // RESTAURANTS_PER_OWNER],
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(KITCHENS)} {prefix}-{i}',
+                    description=f'Neighbourhood kitchen number {i}', address=address(rng),
+                    phone_number=f'555{i:07d}'[-15:],
+                    latitude=CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                    longitude=CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                    created_at=start, updated_at=start,
+                )
+                restaurant.geohash = restaurant.compute_geohash()
+                yield restaurant
+        
+        restaurant_ids = array('q', (restaurant.pk for restaurant in load(
+            'restaurants', Restaurant, restaurant_rows(), index=True)))
+        
+        # Items of restaurant r are at [r * menu_items, (r + 1) * menu_items)
+        item_ids = array('q')
+        item_prices = array('l')
+        
+        def item_rows():
+            rng = random.Random(f'{seed}-menu_items')
+            for restaurant_id in restaurant_ids:
+                for i in range(menu_items):
+                    price = rng.randrange(300, 3000)
+                    item_prices.append(price)
+                    yield MenuItem(
+                        restaurant_id=restaurant_id, name=f'{rng.choice(DISHES)} {i}',
+                        description='Freshly made to order', price=cents(price),
+                        is_available=rng.random() > 0.05, created_at=start, updated_at=start,
+                    )
+        
+        for item in load('menu_items', MenuItem, item_rows(), index=True):
+            item_ids.append(item.pk)
+        
+        rng = random.Random(f'{seed}-orders')
+        active_statuses = list(ACTIVE_STATUS_WEIGHTS)
+        active_weights = list(ACTIVE_STATUS_WEIGHTS.values())
+        history = (now - ACTIVE_WINDOW - start).total_seconds()
+        counts['orders'] = counts['order_items'] = 0
+        for batch in batches(range(orders), batch_size):
+            order_rows = []
+            order_lines = []
+            for _ in batch:
+                # Squaring skews orders towards the first restaurants
+                restaurant = int(restaurants * rng.random() ** 2)
+                first_item = restaurant * menu_items
+                lines = [(first_item + offset, rng.randint(1, 3))
+                         for offset in rng.sample(range(menu_items), rng.randint(1, min(3, menu_items)))]
+                customer = rng.randrange(users)
+                if rng.random() < active_fraction:
+                    created_at = now - ACTIVE_WINDOW * rng.random()
+                    status = rng.choices(active_statuses, active_weights)[0]
+                else:
+                    created_at = start + timedelta(seconds=history * rng.random())
+                    status = 'cancelled' if rng.random() < CANCELLED_SHARE else 'delivered'
+                updated_at = created_at if status == 'pending' else min(
+                    created_at + timedelta(minutes=rng.randint(5, 60)), now)
+                order_rows.append(Order(
+                    user_id=customer_ids[customer], restaurant_id=restaurant_ids[restaurant], status=status,
+                    total_price=cents(sum(item_prices[item] * quantity for item, quantity in lines)),
+                    delivery_address=customer_addresses[customer], created_at=created_at, updated_at=updated_at,
+                ))
+                order_lines.append(lines)
+            
+            with transaction.atomic():
+                order_rows = writer.write(Order, order_rows)
+                order_items = writer.write(OrderItem, [
+                    OrderItem(order_id=order.pk, menu_item_id=item_ids[item], quantity=quantity,
+                              price=cents(item_prices[item]))
+                    for order, lines in zip(order_rows, order_lines)
+                    for item, quantity in lines
+                ])
+            counts['orders'] += len(order_rows)
+            counts['order_items'] += len(order_items)
+            if progress:
+                progress('orders', counts['orders'])
+    
+    writer.finish([User, Restaurant, MenuItem, Order, OrderItem])
+    if stats:
+        rebuild_stats()
+    return counts
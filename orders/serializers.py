@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Order, OrderItem
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from jobs.queue import enqueue
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 from restaurants.serializers import RestaurantSerializer, MenuItemSerializer
 from django.contrib.auth import get_user_model
 from restaurants.models import MenuItem, Restaurant
@@ -19,6 +22,27 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ('id', 'menu_item', 'menu_item_details', 'quantity', 'price')
         read_only_fields = ('price',)
 
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='menu_item.name', read_only=True)
+    
+    class Meta:
+        model = OrderItem
+        fields = ('menu_item', 'name', 'quantity', 'price')
+        read_only_fields = fields
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """
+    Compact order representation used for list responses.
+    """
+    restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = ('id', 'user', 'restaurant', 'restaurant_name', 'status', 'total_price',
+                  'delivery_address', 'items', 'created_at', 'updated_at')
+        read_only_fields = fields
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     restaurant_details = RestaurantSerializer(source='restaurant', read_only=True)
@@ -33,7 +57,7 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ('id', 'user', 'user_details', 'restaurant', 'restaurant_details', 'status', 'total_price', 
                   'delivery_address', 'items', 'order_items', 'created_at', 'updated_at')
-        read_only_fields = ('user', 'total_price', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'status', 'total_price', 'created_at', 'updated_at')
     
     def create(self, validated_data):
         # Extract the order items data
@@ -43,55 +67,93 @@ class OrderSerializer(serializers.ModelSerializer):
         if not order_items_data:
             raise serializers.ValidationError({"order_items": "At least one item is required"})
         
-        # Get restaurant ID from the first menu item
-        first_item = order_items_data[0]
-        menu_item_id = first_item.get('menu_item')
-        
-        try:
-            menu_item = MenuItem.objects.get(id=menu_item_id)
-            restaurant_id = menu_item.restaurant_id
-        except MenuItem.DoesNotExist:
-            raise serializers.ValidationError(f"Menu item with ID {menu_item_id} does not exist")
-        
-        # Verify all items belong to the same restaurant
-        for item_data in order_items_data[1:]:
-            item_id = item_data.get('menu_item')
-            try:
-                item = MenuItem.objects.get(id=item_id)
-                if item.restaurant_id != restaurant_id:
-                    raise serializers.ValidationError("All menu items must belong to the same restaurant")
-            except MenuItem.DoesNotExist:
-                raise serializers.ValidationError(f"Menu item with ID {item_id} does not exist")
-        
-        # Calculate total price
-        total_price = 0
+        # Normalise the requested lines before touching the database
+        lines = []
         for item_data in order_items_data:
             menu_item_id = item_data.get('menu_item')
             quantity = item_data.get('quantity', 1)
-            
-            menu_item = MenuItem.objects.get(id=menu_item_id)
-            total_price += menu_item.price * quantity
+            try:
+                menu_item_id = int(menu_item_id)
+                quantity = int(quantity)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError({"order_items": "Each item needs a valid menu_item ID and quantity"})
+            if quantity < 1:
+                raise serializers.ValidationError({"order_items": "Quantity must be at least 1"})
+            lines.append((menu_item_id, quantity))
         
-        # Create order with the restaurant ID
-        order = Order.objects.create(
-            user=self.context['request'].user,
-            restaurant_id=restaurant_id,
-            total_price=total_price,
-            delivery_address=validated_data.get('delivery_address'),
-            status=validated_data.get('status', 'pending')
-        )
+        # Fetch every referenced menu item in a single query
+        menu_items = MenuItem.objects.in_bulk({menu_item_id for menu_item_id, _ in lines})
         
-        # Create order items
-        for item_data in order_items_data:
-            menu_item_id = item_data.get('menu_item')
-            quantity = item_data.get('quantity', 1)
-            
-            menu_item = MenuItem.objects.get(id=menu_item_id)
-            OrderItem.objects.create(
-                order=order,
-                menu_item=menu_item,
-                quantity=quantity,
-                price=menu_item.price
+        missing = [menu_item_id for menu_item_id, _ in lines if menu_item_id not in menu_items]
+        if missing:
+            raise serializers.ValidationError(f"Menu item with ID {missing[0]} does not exist")
+        
+        # Verify all items belong to the same restaurant and can be ordered
+        restaurant_id = menu_items[lines[0][0]].restaurant_id
+        if any(menu_item.restaurant_id != restaurant_id for menu_item in menu_items.values()):
+            raise serializers.ValidationError("All menu items must belong to the same restaurant")
+        
+        unavailable = [menu_item.name for menu_item in menu_items.values() if not menu_item.is_available]
+        if unavailable:
+            raise serializers.ValidationError(f"Menu item {unavailable[0]} is currently unavailable")
+        
+        # Calculate total price
+        total_price = sum(menu_items[menu_item_id].price * quantity for menu_item_id, quantity in lines)
+        
+        with transaction.atomic():
+            # Create order with the restaurant ID
+            order = Order.objects.create(
+                user=self.context['request'].user,
+                restaurant_id=restaurant_id,
+                total_price=total_price,
+                delivery_address=validated_data.get('delivery_address'),
+                status='pending'
             )
+            
+            # Create order items
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menu_item=menu_items[menu_item_id],
+                    quantity=quantity,
+                    price=menu_items[menu_item_id].price
+                )
+                for menu_item_id, quantity in lines
+            ])
+            
+            # Follow-up work (sales rollups, notifications) runs in the job worker
+            enqueue('orders.order_placed', {'order_id': order.id})
         
-        return order
\ No newline at end of file
+        # Load the nested representation in a fixed number of queries
+        prefetch_related_objects([order], 'items__menu_item')
+        
+        return order
+
+
+class ArchivedOrderItemSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        model = ArchivedOrderItem
+
+class ArchivedOrderItemSummarySerializer(OrderItemSummarySerializer):
+    class Meta(OrderItemSummarySerializer.Meta):
+        model = ArchivedOrderItem
+
+class ArchivedOrderListSerializer(OrderListSerializer):
+    items = ArchivedOrderItemSummarySerializer(many=True, read_only=True)
+    
+    class Meta(OrderListSerializer.Meta):
+        model = ArchivedOrder
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """
+    Read-only full representation of an archived order, shaped like OrderSerializer.
+    """
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    restaurant_details = RestaurantSerializer(source='restaurant', read_only=True)
+    user_details = UserSerializer(source='user', read_only=True)
+    
+    class Meta:
+        model = ArchivedOrder
+        fields = ('id', 'user', 'user_details', 'restaurant', 'restaurant_details', 'status', 'total_price',
+                  'delivery_address', 'items', 'created_at', 'updated_at')
+        read_only_fields = fields
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem, RestaurantDailyStats, MenuItemDailyStats
+
+
+def upsert_increments(model, key_fields, increment_fields, rows, unique_fields=None):
+    """
+    Add ``rows`` into ``model`` with one INSERT ... ON CONFLICT DO UPDATE,
+    incrementing ``increment_fields`` on rows that already exist. Supported by
+    both PostgreSQL and SQLite (3.24+). ``unique_fields`` defaults to
+    ``key_fields`` and must match a unique constraint.
+    """
+    if not rows:
+        return
+    
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [model._meta.get_field(name).column for name in key_fields + increment_fields]
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    updates = ', '.join(
+        f'{qn(model._meta.get_field(name).column)} = {table}.{qn(model._meta.get_field(name).column)}'
+        f' + EXCLUDED.{qn(model._meta.get_field(name).column)}'
+        for name in increment_fields
+    )
+    conflict = ', '.join(qn(model._meta.get_field(name).column) for name in unique_fields or key_fields)
+    sql = (
+        f'INSERT INTO {table} ({", ".join(qn(column) for column in columns)}) '
+        f'VALUES {", ".join([placeholders] * len(rows))} '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+    )
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def add_item_totals(item_rows, sign=1):
+    """
+    Fold order item rows into MenuItemDailyStats increments.
+    ``item_rows`` are (restaurant_id, menu_item_id, date, quantity, price) tuples.
+    """
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for restaurant_id, menu_item_id, date, quantity, price in item_rows:
+        total = totals[(restaurant_id, menu_item_id, date)]
+        total[0] += sign * quantity
+        total[1] += sign * quantity * price
+    
+    upsert_increments(
+        MenuItemDailyStats,
+        ['restaurant', 'menu_item', 'date'],
+        ['quantity', 'revenue'],
+        [key + tuple(total) for key, total in totals.items()],
+        unique_fields=['menu_item', 'date'],
+    )
+
+
+def record_order_placed(order, order_items):
+    day = order_day(order)
+    upsert_increments(
+        RestaurantDailyStats,
+        ['restaurant', 'date'],
+        ['order_count', 'cancelled_count', 'delivered_count', 'revenue'],
+        [(order.restaurant_id, day, 1, 0, 0, order.total_price)],
+    )
+    add_item_totals(
+        (order.restaurant_id, item.menu_item_id, day, item.quantity, item.price)
+        for item in order_items
+    )
+
+
+def record_status_changes(orders, to_status):
+    """
+    Apply the rollup side of orders moving to ``to_status``. Each order needs
+    id, restaurant_id, created_at and total_price.
+    """
+    if to_status not in ('cancelled', 'delivered') or not orders:
+        return
+    
+    totals = defaultdict(lambda: [0, 0, Decimal('0')])
+    for order in orders:
+        total = totals[(order.restaurant_id, order_day(order))]
+        if to_status == 'cancelled':
+            total[0] += 1
+            total[2] -= order.total_price
+        else:
+            total[1] += 1
+    
+    upsert_increments(
+        RestaurantDailyStats,
+        ['restaurant', 'date'],
+        ['order_count', 'cancelled_count', 'delivered_count', 'revenue'],
+        [key + (0,) + tuple(total) for key, total in totals.items()],
+    )
+    
+    if to_status == 'cancelled':
+        days = {order.id: order_day(order) for order in orders}
+        item_rows = OrderItem.objects.filter(order_id__in=days).values_list(
+            'order_id', 'order__restaurant_id', 'menu_item_id', 'quantity', 'price'
+        )
+        add_item_totals(
+            ((restaurant_id, menu_item_id, days[order_id], quantity, price)
+             for order_id, restaurant_id, menu_item_id, quantity, price in item_rows),
+            sign=-1,
+        )
+
+
+def daily_order_rows(orders):
+    return orders.annotate(date=TruncDate('created_at')).values('restaurant_id', 'date').annotate(
+        order_count=Count('id'),
+        cancelled_count=Count('id', filter=Q(status='cancelled')),
+        delivered_count=Count('id', filter=Q(status='delivered')),
+        revenue=Sum('total_price', filter=~Q(status='cancelled')),
+    ).order_by()
+
+
+def daily_item_rows(items):
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return items.exclude(order__status='cancelled').annotate(
+        date=TruncDate('order__created_at'),
+        restaurant_id=F('order__restaurant_id'),
+    ).values('restaurant_id', 'menu_item_id', 'date').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(line_total),
+    ).order_by()
+
+
+@transaction.atomic
+def rebuild_stats(restaurant_ids=None):
+    """
+    Recompute the rollup tables from order history, live and archived.
+    """
+    order_sets = [Order.objects.all(), ArchivedOrder.objects.all()]
+    item_sets = [OrderItem.objects.all(), ArchivedOrderItem.objects.all()]
+    restaurant_stats = RestaurantDailyStats.objects.all()
+    item_stats = MenuItemDailyStats.objects.all()
+    if restaurant_ids:
+        order_sets = [orders.filter(restaurant_id__in=restaurant_ids) for orders in order_sets]
+        item_sets = [items.filter(order__restaurant_id__in=restaurant_ids) for items in item_sets]
+        restaurant_stats = restaurant_stats.filter(restaurant_id__in=restaurant_ids)
+        item_stats = item_stats.filter(restaurant_id__in=restaurant_ids)
+    
+    restaurant_stats.delete()
+    item_stats.delete()
+    
+    # An order moves to the archive whole, but a day can hold both kinds
+    daily = defaultdict(lambda: [0, 0, 0, Decimal('0')])
+    for orders in order_sets:
+        for row in daily_order_rows(orders).iterator():
+            total = daily[(row['restaurant_id'], row['date'])]
+            total[0] += row['order_count']
+            total[1] += row['cancelled_count']
+            total[2] += row['delivered_count']
+            total[3] += row['revenue'] or 0
+    RestaurantDailyStats.objects.bulk_create(
+        (RestaurantDailyStats(
+            restaurant_id=restaurant_id,
+            date=date,
+            order_count=order_count,
+            cancelled_count=cancelled_count,
+            delivered_count=delivered_count,
+            revenue=revenue,
+        ) for (restaurant_id, date), (order_count, cancelled_count, delivered_count, revenue) in daily.items()),
+        batch_size=1000,
+    )
+    
+    item_daily = defaultdict(lambda: [0, Decimal('0')])
+    for items in item_sets:
+        for row in daily_item_rows(items).iterator():
+            total = item_daily[(row['restaurant_id'], row['menu_item_id'], row['date'])]
+            total[0] += row['total_quantity']
+            total[1] += row['total_revenue'] or 0
+    MenuItemDailyStats.objects.bulk_create(
+        (MenuItemDailyStats(
+            restaurant_id=restaurant_id,
+            menu_item_id=menu_item_id,
+            date=date,
+            quantity=quantity,
+            revenue=revenue,
+        ) for (restaurant_id, menu_item_id, date), (quantity, revenue) in item_daily.items()),
+        batch_size=1000,
+    )
@@ -0,0 +1,18 @@
+from jobs.queue import job
+
+from .models import Order, OrderItem
+from .stats import record_order_placed, record_status_changes
+
+
+@job('orders.order_placed')
+def order_placed(order_id):
+    order = Order.objects.filter(pk=order_id).only('id', 'restaurant_id', 'created_at', 'total_price').first()
+    if order is None:
+        return
+    record_order_placed(order, OrderItem.objects.filter(order_id=order_id).only('menu_item_id', 'quantity', 'price'))
+
+
+@job('orders.status_changed')
+def status_changed(order_ids, status):
+    orders = list(Order.objects.filter(pk__in=order_ids).only('id', 'restaurant_id', 'created_at', 'total_price'))
+    record_status_changes(orders, status)
@@ -1,3 +1,598 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from jobs.queue import run_pending_jobs
+from quickfood_backend.testing import QueryBudgetMixin
+from quickfood_backend.throttling import ScopedRateThrottle, SlidingWindowThrottle, reset_throttles
+from restaurants.models import Restaurant, MenuItem
+from .benchmark import SCENARIOS, clear_dataset, run_benchmark, seed_dataset
+from .events import InMemoryBackend, OrderEventBroker, get_broker
+from .models import ArchivedOrder, IdempotencyKey, MenuItemDailyStats, Order, OrderItem, RestaurantDailyStats
+from .seeding import PASSWORD, copy_value
 
-# Create your tests here.
+User = get_user_model()
+
+
+class OrderTestMixin:
+    def setUp(self):
+        reset_throttles()
+        self.owner = User.objects.create_user(username='owner', password='pass', role='restaurant_owner')
+        self.customer = User.objects.create_user(username='customer', password='pass', role='user')
+        self.restaurant = Restaurant.objects.create(
+            owner=self.owner, name='Grill', description='Grill house', address='1 Main St', phone_number='123'
+        )
+        self.menu_items = [
+            MenuItem.objects.create(restaurant=self.restaurant, name=f'Dish {i}', description='Tasty', price='5.50')
+            for i in range(15)
+        ]
+        self.client = APIClient()
+
+    def create_order(self, items, user=None):
+        self.client.force_authenticate(user or self.customer)
+        return self.client.post('/api/orders/', {
+            'restaurant': self.restaurant.id,
+            'delivery_address': '2 Side St',
+            'order_items': [{'menu_item': item.id, 'quantity': 2} for item in items],
+        }, format='json')
+
+
+class OrderCreateTests(OrderTestMixin, TestCase):
+    def test_create_order(self):
+        response = self.create_order(self.menu_items[:3])
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.restaurant, self.restaurant)
+        self.assertEqual(str(order.total_price), '33.00')
+        self.assertEqual(order.items.count(), 3)
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.create_order(self.menu_items[:1]).status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.create_order(self.menu_items).status_code, 201)
+        self.assertEqual(len(small), len(large))
+
+    def test_items_from_different_restaurants_are_rejected(self):
+        other = Restaurant.objects.create(
+            owner=self.owner, name='Sushi', description='Sushi bar', address='3 Bay Rd', phone_number='456'
+        )
+        other_item = MenuItem.objects.create(restaurant=other, name='Roll', description='Fresh', price='8.00')
+        response = self.create_order([self.menu_items[0], other_item])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_unavailable_item_is_rejected(self):
+        MenuItem.objects.filter(pk=self.menu_items[0].pk).update(is_available=False)
+        response = self.create_order(self.menu_items[:2])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_missing_item_is_rejected(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post('/api/orders/', {
+            'restaurant': self.restaurant.id,
+            'delivery_address': '2 Side St',
+            'order_items': [{'menu_item': 999999, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderListTests(OrderTestMixin, TestCase):
+    def place_orders(self, count):
+        for _ in range(count):
+            self.assertEqual(self.create_order(self.menu_items[:3]).status_code, 201)
+
+    def test_list_is_compact(self):
+        self.place_orders(1)
+        response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        order = response.data['results'][0]
+        self.assertEqual(order['restaurant_name'], 'Grill')
+        self.assertNotIn('restaurant_details', order)
+        self.assertEqual(set(order['items'][0]), {'menu_item', 'name', 'quantity', 'price'})
+
+    def test_full_detail_on_request(self):
+        self.place_orders(1)
+        response = self.client.get('/api/orders/', {'detail': 'full'})
+        self.assertIn('restaurant_details', response.data['results'][0])
+        detail = self.client.get(f"/api/orders/{response.data['results'][0]['id']}/")
+        self.assertIn('restaurant_details', detail.data)
+
+    def test_list_query_count_is_constant(self):
+        self.place_orders(1)
+        self.client.force_authenticate(self.owner)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/orders/')
+        self.place_orders(5)
+        self.client.force_authenticate(self.owner)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get('/api/orders/')
+        self.assertEqual(len(few), len(many))
+
+
+class OrderQueryBudgetTests(QueryBudgetMixin, OrderTestMixin, TestCase):
+    def grow_orders(self, size):
+        for _ in range(Order.objects.count(), size):
+            self.create_order(self.menu_items[:3])
+        self.client.force_authenticate(self.owner)
+
+    def test_owner_order_list(self):
+        self.assertQueryBudget(3, lambda: self.client.get('/api/orders/'), self.grow_orders)
+
+    def test_full_detail_list(self):
+        self.assertQueryBudget(4, lambda: self.client.get('/api/orders/', {'detail': 'full'}), self.grow_orders)
+
+
+@override_settings(SHARED_CACHE=True)
+class OrderConditionalRequestTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.order_id = self.create_order(self.menu_items[:2]).data['id']
+        self.url = f'/api/orders/{self.order_id}/'
+
+    def test_detail_and_list_revalidate(self):
+        for url in (self.url, '/api/orders/'):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_status_change_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.owner)
+        owner_etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(owner_etag, etag)
+        self.client.patch(f'{self.url}update_status/', {'status': 'preparing'}, format='json')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=owner_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'preparing')
+
+    def test_menu_item_rename_changes_list_etag(self):
+        etag = self.client.get('/api/orders/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menu_items[0].name = 'Renamed dish'
+            self.menu_items[0].save()
+        response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['items'][0]['name'], 'Renamed dish')
+
+    def test_other_users_orders_are_not_revealed(self):
+        other = User.objects.create_user(username='other', password='pass', role='user')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+class OrderPaginationTests(OrderTestMixin, TestCase):
+    def test_cursor_pagination_walks_all_orders(self):
+        for _ in range(5):
+            self.create_order(self.menu_items[:1])
+        seen = []
+        url = '/api/orders/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_status_and_date_filters(self):
+        self.create_order(self.menu_items[:1])
+        self.create_order(self.menu_items[:1])
+        Order.objects.filter(pk=Order.objects.first().pk).update(status='delivered')
+        response = self.client.get('/api/orders/', {'status': 'delivered'})
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get('/api/orders/', {'created_after': '2000-01-01', 'created_before': '2000-01-02'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/api/orders/', {'created_after': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderEventBrokerTests(SimpleTestCase):
+    async def test_publish_from_another_thread_reaches_subscriber(self):
+        broker = OrderEventBroker(InMemoryBackend())
+        subscription = broker.subscribe(7)
+        other = broker.subscribe(8)
+        await sync_to_async(broker.publish, thread_sensitive=False)([7], 'order_status', {'id': 1})
+        self.assertEqual(await subscription.get(), ('order_status', '{"id": 1}'))
+        self.assertTrue(other.queue.empty())
+        subscription.close()
+        other.close()
+        self.assertEqual(dict(broker.backend._subscribers), {})
+
+
+class OrderEventStreamTests(OrderTestMixin, TestCase):
+    def test_status_update_notifies_customer_and_owner(self):
+        self.create_order(self.menu_items[:1])
+        order = Order.objects.get()
+        self.client.force_authenticate(self.owner)
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(f'/api/orders/{order.id}/update_status/', {'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+        user_ids, event, data = publish.call_args.args
+        self.assertEqual(set(user_ids), {self.customer.id, self.owner.id})
+        self.assertEqual(event, 'order_status')
+        self.assertEqual(data['status'], 'preparing')
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get('/api/orders/events/')
+        self.assertEqual(response.status_code, 401)
+
+
+class OrderStatusTransitionTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_order(self.menu_items[:1])
+        self.order = Order.objects.get()
+        self.client.force_authenticate(self.owner)
+
+    def patch_status(self, url, **data):
+        return self.client.patch(url, data, format='json')
+
+    def test_allowed_transitions(self):
+        url = f'/api/orders/{self.order.id}/'
+        for status_value in ('preparing', 'out_for_delivery', 'delivered'):
+            response = self.patch_status(url, status=status_value)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['status'], status_value)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'delivered')
+
+    def test_backward_transition_is_a_conflict(self):
+        Order.objects.filter(pk=self.order.pk).update(status='delivered')
+        response = self.patch_status(f'/api/orders/{self.order.id}/update_status/', status='pending')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'delivered')
+
+    def test_missing_or_null_status_is_a_validation_error(self):
+        for url in (f'/api/orders/{self.order.id}/', f'/api/orders/{self.order.id}/update_status/'):
+            self.assertEqual(self.patch_status(url, status=None).status_code, 400)
+            self.assertEqual(self.patch_status(url, expected_status='pending').status_code, 400)
+            self.assertEqual(self.patch_status(url).status_code, 400)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+    def test_stale_expected_status_is_a_conflict(self):
+        url = f'/api/orders/{self.order.id}/update_status/'
+        self.assertEqual(self.patch_status(url, status='preparing', expected_status='pending').status_code, 200)
+        response = self.patch_status(url, status='cancelled', expected_status='pending')
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'preparing')
+
+    def test_update_is_a_single_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.patch_status(f'/api/orders/{self.order.id}/update_status/', status='preparing')
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"delivery_address"', updates[0])
+
+    def test_other_owner_is_forbidden(self):
+        other = User.objects.create_user(username='other', password='pass', role='restaurant_owner')
+        Restaurant.objects.create(owner=other, name='Other', description='x', address='x', phone_number='1')
+        self.client.force_authenticate(other)
+        response = self.patch_status(f'/api/orders/{self.order.id}/update_status/', status='preparing')
+        self.assertEqual(response.status_code, 404)
+
+    def test_customer_cannot_update_status(self):
+        self.client.force_authenticate(self.customer)
+        response = self.patch_status(f'/api/orders/{self.order.id}/', status='cancelled')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderPermissionTests(OrderTestMixin, TestCase):
+    def test_owner_check_adds_no_queries(self):
+        self.create_order(self.menu_items[:2])
+        order = Order.objects.get()
+        counts = []
+        for user in (self.customer, self.owner):
+            self.client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(f'/api/orders/{order.id}/').status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class OrderBulkStatusTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(4):
+            self.create_order(self.menu_items[:1])
+        self.order_ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        Order.objects.filter(pk=self.order_ids[0]).update(status='delivered')
+        self.client.force_authenticate(self.owner)
+
+    def bulk_update(self, ids, status_value='preparing'):
+        return self.client.patch('/api/orders/bulk-status/', {'ids': ids, 'status': status_value}, format='json')
+
+    def test_bulk_update_reports_per_order_results(self):
+        response = self.bulk_update(self.order_ids + [999999])
+        self.assertEqual(response.status_code, 200)
+        results = {row['id']: row for row in response.data['results']}
+        self.assertEqual(results[self.order_ids[0]], {'id': self.order_ids[0], 'result': 'conflict', 'status': 'delivered'})
+        for order_id in self.order_ids[1:]:
+            self.assertEqual(results[order_id]['result'], 'updated')
+        self.assertEqual(results[999999]['result'], 'not_found')
+        self.assertEqual(Order.objects.filter(status='preparing').count(), 3)
+
+    def test_bulk_update_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as few:
+            self.bulk_update(self.order_ids[1:2], 'cancelled')
+        with CaptureQueriesContext(connection) as many:
+            self.bulk_update(self.order_ids[2:], 'cancelled')
+        self.assertEqual(len(few), len(many))
+
+    def test_customer_cannot_bulk_update(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.bulk_update(self.order_ids).status_code, 403)
+
+
+class SalesStatsTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_order(self.menu_items[:2])
+        self.create_order(self.menu_items[:1])
+        self.create_order(self.menu_items[1:3])
+
+    def get_stats(self):
+        run_pending_jobs()
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f'/api/restaurants/restaurant/{self.restaurant.id}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rollup_tracks_placement_and_cancellation(self):
+        stats = self.get_stats()
+        self.assertEqual(stats['totals']['order_count'], 3)
+        self.assertEqual(stats['totals']['revenue'], Decimal('55.00'))
+        quantities = {item['menu_item']: item['quantity'] for item in stats['top_items']}
+        self.assertEqual(quantities, {self.menu_items[0].id: 4, self.menu_items[1].id: 4, self.menu_items[2].id: 2})
+
+        cancelled = Order.objects.order_by('id').last()
+        self.client.patch(f'/api/orders/{cancelled.id}/update_status/', {'status': 'cancelled'})
+        stats = self.get_stats()
+        self.assertEqual(stats['totals']['cancelled_count'], 1)
+        self.assertEqual(stats['totals']['revenue'], Decimal('33.00'))
+        quantities = {item['menu_item']: item['quantity'] for item in stats['top_items']}
+        self.assertNotIn(self.menu_items[2].id, quantities)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        run_pending_jobs()
+        Order.objects.filter(pk=Order.objects.first().pk).update(status='delivered')
+        call_command('rebuild_sales_stats', stdout=StringIO())
+        stats = self.get_stats()
+        self.assertEqual(stats['totals']['order_count'], 3)
+        self.assertEqual(stats['totals']['delivered_count'], 1)
+        self.assertEqual(stats['totals']['revenue'], Decimal('55.00'))
+
+    def test_only_owner_can_view_stats(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(f'/api/restaurants/restaurant/{self.restaurant.id}/stats/')
+        self.assertEqual(response.status_code, 403)
+
+
+class IdempotentOrderCreateTests(OrderTestMixin, TestCase):
+    def post_order(self, key, quantity=1):
+        self.client.force_authenticate(self.customer)
+        return self.client.post('/api/orders/', {
+            'restaurant': self.restaurant.id,
+            'delivery_address': '2 Side St',
+            'order_items': [{'menu_item': self.menu_items[0].id, 'quantity': quantity}],
+        }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.post_order('abc')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post_order('abc')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('orders_order"', tables)
+        self.assertNotIn('restaurants_menuitem', tables)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self.post_order('abc')
+        self.assertEqual(self.post_order('abc', quantity=3).status_code, 422)
+
+    def test_in_progress_key_is_a_conflict(self):
+        self.post_order('abc')
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+        response = self.post_order('abc')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        MenuItem.objects.filter(pk=self.menu_items[0].pk).update(is_available=False)
+        self.assertEqual(self.post_order('abc').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        MenuItem.objects.filter(pk=self.menu_items[0].pk).update(is_available=True)
+        self.assertEqual(self.post_order('abc').status_code, 201)
+
+    def test_expired_key_is_evicted(self):
+        self.post_order('abc')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.post_order('abc').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+class OrderArchiveTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            self.create_order(self.menu_items[:2])
+        self.old_id, self.recent_id, self.active_id = Order.objects.order_by('id').values_list('id', flat=True)
+        Order.objects.filter(pk__in=[self.old_id, self.recent_id]).update(status='delivered')
+        Order.objects.filter(pk=self.old_id).update(updated_at=timezone.now() - timedelta(days=120))
+
+    def test_archives_only_old_terminal_orders(self):
+        call_command('archive_orders', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.recent_id, self.active_id})
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.id, self.old_id)
+        self.assertEqual(archived.items.count(), 2)
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old_id).exists())
+
+    def test_archived_orders_are_served_in_history_mode(self):
+        call_command('archive_orders', stdout=StringIO())
+        live = self.client.get('/api/orders/')
+        self.assertNotIn(self.old_id, [order['id'] for order in live.data['results']])
+        history = self.client.get('/api/orders/', {'history': 'archived'})
+        self.assertEqual([order['id'] for order in history.data['results']], [self.old_id])
+        self.assertEqual(history.data['results'][0]['restaurant_name'], 'Grill')
+        detail = self.client.get(f'/api/orders/{self.old_id}/')
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(detail.data['status'], 'delivered')
+        self.assertEqual(len(detail.data['items']), 2)
+
+    def test_other_users_cannot_see_archived_orders(self):
+        call_command('archive_orders', stdout=StringIO())
+        other = User.objects.create_user(username='other', password='pass', role='user')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/orders/{self.old_id}/').status_code, 404)
+
+    def test_rebuild_keeps_archived_orders_in_the_rollups(self):
+        run_pending_jobs()
+        call_command('rebuild_sales_stats', stdout=StringIO())
+        totals = RestaurantDailyStats.objects.aggregate(orders=Sum('order_count'), revenue=Sum('revenue'))
+        items = list(MenuItemDailyStats.objects.order_by('menu_item_id').values_list('menu_item_id', 'quantity'))
+        call_command('archive_orders', stdout=StringIO())
+        self.assertTrue(ArchivedOrder.objects.exists())
+        call_command('rebuild_sales_stats', stdout=StringIO())
+        self.assertEqual(
+            RestaurantDailyStats.objects.aggregate(orders=Sum('order_count'), revenue=Sum('revenue')), totals
+        )
+        self.assertEqual(
+            list(MenuItemDailyStats.objects.order_by('menu_item_id').values_list('menu_item_id', 'quantity')), items
+        )
+
+
+class ThrottleTests(OrderTestMixin, TestCase):
+    RATES = {'user': '1000/min', 'anon': '1000/min', 'reads': '5/min', 'order_create': '2/min'}
+    
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', self.RATES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_order_create_scope(self):
+        self.assertEqual(self.create_order(self.menu_items[:1]).status_code, 201)
+        self.assertEqual(self.create_order(self.menu_items[:1]).status_code, 201)
+        response = self.create_order(self.menu_items[:1])
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Rejected requests are not counted, and other users have their own budget
+        other = User.objects.create_user(username='other', password='pass', role='user')
+        self.assertEqual(self.create_order(self.menu_items[:1], user=other).status_code, 201)
+    
+    def test_polling_reads_are_limited_per_user(self):
+        self.client.force_authenticate(self.customer)
+        statuses = [self.client.get('/api/orders/').status_code for _ in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+    
+    def test_sliding_window_weights_the_previous_window(self):
+        throttle = ScopedRateThrottle()
+        request = mock.Mock(user=self.customer, method='GET', META={'REMOTE_ADDR': '10.0.0.1'})
+        with mock.patch.object(ScopedRateThrottle, 'timer', return_value=600.0):
+            for _ in range(5):
+                self.assertTrue(throttle.allow_scope(request, 'reads'))
+            self.assertFalse(throttle.allow_scope(request, 'reads'))
+            self.assertEqual(throttle.wait(), 60)
+        # Halfway through the next minute, half of the previous window still counts
+        with mock.patch.object(ScopedRateThrottle, 'timer', return_value=690.0):
+            for _ in range(3):
+                self.assertTrue(throttle.allow_scope(request, 'reads'))
+            self.assertFalse(throttle.allow_scope(request, 'reads'))
+            # 5 * 0.5 + 3 requests: one more fits once the old share drops below 2
+            self.assertEqual(throttle.wait(), 6)
+
+
+class BenchmarkTests(TestCase):
+    def test_seeded_scenarios_run_without_errors(self):
+        dataset = seed_dataset(restaurants=6, menu_items=4, users=5, orders=40, seed=7)
+        self.assertEqual(dataset['owners'], 2)
+        self.assertEqual(dataset['menu_items'], 24)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertTrue(Restaurant.objects.exclude(geohash='').exists())
+
+        results = run_benchmark(requests=3, warmup=1, seed=7)
+        self.assertEqual(set(results), set(SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 3)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+            self.assertGreaterEqual(result['queries_per_request']['max'], 1)
+
+    def test_kept_database_can_be_seeded_again(self):
+        seed_dataset(restaurants=2, menu_items=2, users=2, orders=5)
+        clear_dataset()
+        dataset = seed_dataset(restaurants=2, menu_items=2, users=2, orders=5)
+        self.assertEqual(dataset['restaurants'], 2)
+        self.assertEqual(Order.objects.count(), 5)
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, *args):
+        call_command('seed', '--restaurants', '6', '--menu-items', '4', '--users', '5', '--orders', '30',
+                     '--batch-size', '7', '--active-fraction', '0.2', *args, stdout=StringIO())
+
+    def snapshot(self):
+        return list(Order.objects.order_by('id').values_list(
+            'user__username', 'restaurant__name', 'status', 'total_price', 'delivery_address',
+        )), list(OrderItem.objects.order_by('id').values_list('menu_item__name', 'quantity', 'price'))
+
+    def test_creates_consistent_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.filter(role='restaurant_owner').count(), 2)
+        self.assertEqual(User.objects.filter(role='user').count(), 5)
+        self.assertEqual(MenuItem.objects.count(), 24)
+        self.assertEqual(Order.objects.count(), 30)
+        self.assertFalse(Restaurant.objects.filter(geohash='').exists())
+        # Totals match the items, which all come from the order's restaurant
+        for order in Order.objects.prefetch_related('items__menu_item'):
+            items = list(order.items.all())
+            self.assertEqual(order.total_price, sum(item.price * item.quantity for item in items))
+            self.assertEqual({item.menu_item.restaurant_id for item in items}, {order.restaurant_id})
+            self.assertLessEqual(order.created_at, order.updated_at)
+        self.assertEqual(
+            RestaurantDailyStats.objects.aggregate(total=Sum('order_count'))['total'], Order.objects.count()
+        )
+        self.assertTrue(User.objects.get(username='seed-customer-0').check_password(PASSWORD))
+
+    def test_same_seed_gives_same_data(self):
+        self.seed('--seed', '3')
+        first = self.snapshot()
+        User.objects.all().delete()
+        self.seed('--seed', '3')
+        self.assertEqual(self.snapshot(), first)
+
+    def test_existing_prefix_is_rejected(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed('--prefix', 'again', '--orders', '0', '--no-stats')
+        self.assertEqual(Restaurant.objects.count(), 12)
+
+    def test_copy_values_are_escaped(self):
+        self.assertEqual(copy_value(None), '\\N')
+        self.assertEqual(copy_value(True), 't')
+        self.assertEqual(copy_value({'a': 1}), '{"a": 1}')
+        self.assertEqual(copy_value('tab\there\nback\\slash'), 'tab\\there\\nback\\\\slash')
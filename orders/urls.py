@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet
+from .views import OrderViewSet, order_events
 
 router = DefaultRouter()
 router.register(r'', OrderViewSet)
 
 urlpatterns = [
+    path('events/', order_events, name='order_events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
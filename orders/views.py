@@ -1,25 +1,149 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, status
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied, MethodNotAllowed
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderItemSerializer
+from rest_framework.exceptions import APIException, PermissionDenied, MethodNotAllowed, ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+from accounts.authentication import get_users_version
+from quickfood_backend.conditional import ConditionalGetMixin
+from quickfood_backend.pagination import CreatedAtCursorPagination
+from restaurants.cache import get_all_menus_version, get_menu_version
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from .serializers import (
+    OrderSerializer, OrderListSerializer, ArchivedOrderSerializer, ArchivedOrderListSerializer,
+)
 from .permissions import IsOrderOwnerOrRestaurantOwner
+from .events import get_broker, get_setting, publish_order_status
+from jobs.queue import enqueue
+from .idempotency import IdempotentCreateMixin
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, IsOrderOwnerOrRestaurantOwner]
+    pagination_class = CreatedAtCursorPagination
+    throttle_scopes = {'create': 'order_create'}
+    BULK_STATUS_LIMIT = 200
+    
+    # Set by retrieve when a live lookup misses and the archive is consulted
+    archive_fallback = False
+    
+    def wants_full_detail(self):
+        # Full nested orders are served on retrieve or when asked for with ?detail=full
+        return self.action != 'list' or self.request.query_params.get('detail') == 'full'
+    
+    def in_history_mode(self):
+        # Archived orders are read-only and only served by list and retrieve
+        if self.action not in ('list', 'retrieve'):
+            return False
+        return self.archive_fallback or self.request.query_params.get('history') == 'archived'
+    
+    def get_serializer_class(self):
+        if self.in_history_mode():
+            return ArchivedOrderSerializer if self.wants_full_detail() else ArchivedOrderListSerializer
+        if self.wants_full_detail():
+            return OrderSerializer
+        return OrderListSerializer
     
     def get_queryset(self):
         user = self.request.user
+        if self.in_history_mode():
+            model, item_model = ArchivedOrder, ArchivedOrderItem
+        else:
+            model, item_model = Order, OrderItem
         
         # Restaurant owners can see orders for their restaurants
         if user.role == 'restaurant_owner':
-            return Order.objects.filter(restaurant__owner=user)
+            queryset = model.objects.filter(restaurant__owner=user)
+        else:
+            # Regular users can only see their own orders
+            queryset = model.objects.filter(user=user)
+        
+        if self.action == 'list':
+            queryset = self.filter_list(queryset)
+        
+        if self.wants_full_detail():
+            return queryset.select_related('user', 'restaurant__owner').prefetch_related(
+                'restaurant__menu_items',
+                Prefetch('items', queryset=item_model.objects.select_related('menu_item')),
+            )
+        
+        return queryset.select_related('restaurant').only(
+            'id', 'user_id', 'restaurant_id', 'restaurant__name', 'status', 'total_price',
+            'delivery_address', 'created_at', 'updated_at',
+        ).prefetch_related(
+            Prefetch('items', queryset=item_model.objects.select_related('menu_item').only(
+                'id', 'order_id', 'menu_item_id', 'menu_item__name', 'quantity', 'price',
+            )),
+        )
+    
+    def get_validator_fields(self):
+        return [*super().get_validator_fields(), 'restaurant_id']
+    
+    def get_validator_versions(self, rows):
+        # Orders embed restaurant and menu item names (and, in full, users)
+        if self.detail:
+            versions = [get_menu_version(rows[0]['restaurant_id'])]
+        else:
+            versions = [get_all_menus_version()]
+        if self.wants_full_detail():
+            versions.append(get_users_version())
+        return versions
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if self.in_history_mode():
+                raise
+            # Orders moved to the archive keep their IDs, so fall back to it
+            self.archive_fallback = True
+            return super().retrieve(request, *args, **kwargs)
+    
+    def parse_date_param(self, name, end_of_day=False):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValidationError({name: "Enter a valid ISO 8601 date or datetime."})
+            parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    
+    def filter_list(self, queryset):
+        # Filters stay on the (owner/restaurant, created_at) index prefix
+        status_value = self.request.query_params.get('status')
+        if status_value:
+            valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
+            if status_value not in valid_statuses:
+                raise ValidationError({"status": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"})
+            queryset = queryset.filter(status=status_value)
         
-        # Regular users can only see their own orders
-        return Order.objects.filter(user=user)
+        created_after = self.parse_date_param('created_after')
+        if created_after:
+            queryset = queryset.filter(created_at__gte=created_after)
+        
+        created_before = self.parse_date_param('created_before', end_of_day=True)
+        if created_before:
+            queryset = queryset.filter(created_at__lte=created_before)
+        
+        return queryset
     
     def perform_create(self, serializer):
         # Only customers can create orders
@@ -33,19 +157,27 @@ class OrderViewSet(viewsets.ModelViewSet):
         raise MethodNotAllowed("PUT", detail="Orders cannot be updated after placement. Use PATCH to update status only.")
     
     def partial_update(self, request, *args, **kwargs):
-        # Check if request data is empty
-        if not request.data:
-            return Response(
-                {"status": "This field is required."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
         # Only allow status updates
-        if list(request.data.keys()) != ['status']:
+        if set(request.data.keys()) - {'status', 'expected_status'}:
             raise PermissionDenied("Only order status can be updated after placement.")
         
-        # Validate status value
+        return self.transition_status(request, pk=kwargs['pk'],
+                                      forbidden_message="Only the restaurant owner can update order status.")
+    
+    @action(detail=True, methods=['patch'])
+    def update_status(self, request, pk=None):
+        return self.transition_status(request, pk=pk,
+                                      forbidden_message="You do not have permission to update this order's status.")
+    
+    @action(detail=False, methods=['patch'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Move many orders to one status. Ownership and transitions are checked
+        for the whole batch with one query and applied with one UPDATE.
+        """
         status_value = request.data.get('status')
+        order_ids = request.data.get('ids')
+        
         valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
         if status_value not in valid_statuses:
             return Response(
@@ -53,49 +185,192 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get the order
-        order = self.get_object()
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response({"ids": "A non-empty list of order IDs is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(order_ids) > self.BULK_STATUS_LIMIT:
+            return Response(
+                {"ids": f"At most {self.BULK_STATUS_LIMIT} orders can be updated at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+        except (TypeError, ValueError):
+            return Response({"ids": "Order IDs must be integers."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Only restaurant owners can update status
-        if request.user.role != 'restaurant_owner' or order.restaurant.owner != request.user:
-            raise PermissionDenied("Only the restaurant owner can update order status.")
+        if request.user.role != 'restaurant_owner':
+            raise PermissionDenied("Only restaurant owners can update order status.")
         
-        # Update status
-        order.status = status_value
-        order.save()
+        current = {
+            row['id']: row
+            for row in Order.objects.filter(pk__in=order_ids, restaurant__owner=request.user)
+                                    .values('id', 'status', 'user_id', 'restaurant_id')
+        }
         
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        source_statuses = Order.source_statuses(status_value)
+        eligible = [order_id for order_id in order_ids
+                    if order_id in current and current[order_id]['status'] in source_statuses]
+        
+        updated_ids = set()
+        if eligible:
+            now = timezone.now()
+            with transaction.atomic():
+                # Re-check the status in the UPDATE itself so concurrent changes are not overwritten
+                updated = Order.objects.filter(pk__in=eligible, status__in=source_statuses).update(
+                    status=status_value, updated_at=now
+                )
+                if updated == len(eligible):
+                    updated_ids = set(eligible)
+                else:
+                    updated_ids = set(Order.objects.filter(pk__in=eligible, status=status_value, updated_at=now)
+                                                   .values_list('id', flat=True))
+                
+                if updated_ids:
+                    enqueue('orders.status_changed', {'order_ids': sorted(updated_ids), 'status': status_value})
+            
+            for order_id in updated_ids:
+                row = current[order_id]
+                publish_order_status(
+                    Order(id=order_id, user_id=row['user_id'], restaurant_id=row['restaurant_id'],
+                          status=status_value, updated_at=now),
+                    request.user.id,
+                )
+        
+        results = []
+        for order_id in order_ids:
+            if order_id not in current:
+                results.append({"id": order_id, "result": "not_found"})
+            elif order_id in updated_ids:
+                results.append({"id": order_id, "result": "updated"})
+            else:
+                results.append({"id": order_id, "result": "conflict", "status": current[order_id]['status']})
+        
+        return Response({"status": status_value, "results": results})
     
-    @action(detail=True, methods=['patch'])
-    def update_status(self, request, pk=None):
-        # Check if status value is provided
+    def transition_status(self, request, pk, forbidden_message):
+        """
+        Move an order to ``request.data['status']`` with a single conditional
+        UPDATE that only matches when the order belongs to one of the caller's
+        restaurants and is in a status the transition table allows (or in
+        ``expected_status`` when the client pins it). Only ``status`` and
+        ``updated_at`` are written.
+        """
         status_value = request.data.get('status')
-        if not status_value:
-            return Response(
-                {"status": "This field is required."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-        # Validate status value
-        valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
-        if status_value not in valid_statuses:
-            return Response(
-                {"status": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        expected_status = request.data.get('expected_status')
         
-        order = self.get_object()
+        # Validate status values before touching the order, so bad input is a 400 and not a conflict
+        if status_value in (None, ''):
+            return Response({"status": "This field is required."}, status=status.HTTP_400_BAD_REQUEST)
+        valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
+        for field, value in (('status', status_value), ('expected_status', expected_status)):
+            if value is not None and value not in valid_statuses:
+                return Response(
+                    {field: f"Invalid status. Must be one of: {', '.join(valid_statuses)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
         # Only restaurant owners can update order status
-        if request.user.role != 'restaurant_owner' or order.restaurant.owner != request.user:
+        if request.user.role != 'restaurant_owner':
+            raise PermissionDenied(forbidden_message)
+        
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        
+        source_statuses = Order.source_statuses(status_value)
+        if expected_status is not None:
+            source_statuses = [expected_status] if expected_status in source_statuses else []
+        
+        with transaction.atomic():
+            updated = Order.objects.filter(
+                pk=pk,
+                status__in=source_statuses,
+                restaurant__owner=request.user,
+            ).update(status=status_value, updated_at=timezone.now())
+            
+            if updated:
+                enqueue('orders.status_changed', {'order_ids': [pk], 'status': status_value})
+        
+        if not updated:
+            # Work out why nothing matched; this read only happens on failure
+            current = self.get_queryset().filter(pk=pk).values('status', 'restaurant__owner_id').first()
+            if current is None:
+                raise Http404
+            if current['restaurant__owner_id'] != request.user.id:
+                raise PermissionDenied(forbidden_message)
             return Response(
-                {"detail": "You do not have permission to update this order's status."},
-                status=status.HTTP_403_FORBIDDEN
+                {
+                    "detail": f"Cannot change order status from {current['status']} to {status_value}.",
+                    "status": current['status'],
+                },
+                status=status.HTTP_409_CONFLICT
             )
         
-        order.status = status_value
-        order.save()
+        order = self.get_queryset().get(pk=pk)
+        publish_order_status(order, request.user.id)
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
+
+def authenticate_stream_request(request):
+    """
+    Run the configured DRF authenticators against a plain Django request.
+    EventSource cannot send headers, so an ``access_token`` query parameter
+    is accepted in place of the Authorization header.
+    """
+    token = request.GET.get('access_token')
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+async def stream_order_events(subscription, order_id=None):
+    heartbeat = get_setting('HEARTBEAT_INTERVAL')
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event, data = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing idle connections
+                yield ': keepalive\n\n'
+                continue
+            
+            if order_id is not None and json.loads(data)['id'] != order_id:
+                continue
+            yield f'event: {event}\ndata: {data}\n\n'
+    finally:
+        subscription.close()
+
+@require_GET
+async def order_events(request):
+    """
+    Server-sent event stream of status changes for orders the caller placed
+    or receives as a restaurant owner. Optionally narrowed with ``?order=<id>``.
+    Connections are held without a worker thread when served through the ASGI
+    application.
+    """
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    
+    order_id = request.GET.get('order')
+    if order_id is not None:
+        try:
+            order_id = int(order_id)
+        except ValueError:
+            return JsonResponse({"order": "Order ID must be an integer."}, status=400)
+    
+    subscription = get_broker().subscribe(user.pk)
+    response = StreamingHttpResponse(
+        stream_order_events(subscription, order_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -3,6 +3,11 @@ ASGI config for quickfood_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this application (e.g. ``uvicorn
+quickfood_backend.asgi:application``) so the order event stream at
+``/api/orders/events/`` holds idle connections on the event loop instead of
+occupying a worker thread each.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
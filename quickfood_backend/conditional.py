@@ -0,0 +1,204 @@
+"""
+Conditional GET support for model viewsets.
+
+ConditionalGetMixin gives ``list`` and ``retrieve`` an ``ETag`` (and, for
+single objects, ``Last-Modified``) computed from the ids and ``updated_at`` of
+the rows the response covers, read with one narrow query over just that
+object or page, plus cached version counters for data it embeds from other
+models. A matching ``If-None-Match`` (or ``If-Modified-Since``) gets 304
+without loading the full objects or serializing anything. Rendered JSON responses can also be cached per user
+under the ETag, so a changed validator retires them on its own.
+"""
+import hashlib
+import json
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'CACHE_RESPONSES': False,
+    'CACHE_TIMEOUT': 300,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'CONDITIONAL_REQUESTS', {}).get(name, DEFAULTS[name])
+
+
+def cache_is_shared():
+    """
+    Whether every process uses the same default cache, so version counters
+    and markers kept there are seen by all of them. SHARED_CACHE overrides
+    the check, which otherwise treats local-memory and dummy caches as
+    per-process.
+    """
+    shared = getattr(settings, 'SHARED_CACHE', None)
+    if shared is None:
+        shared = not isinstance(caches['default'], (LocMemCache, DummyCache))
+    return shared
+
+
+def new_version():
+    # Time based so a version lost to eviction never reuses an old number
+    return time.time_ns() // 1000
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), timeout=None)
+
+
+# ``exact`` means Last-Modified alone describes the response, so
+# If-Modified-Since can be answered from it
+Validators = namedtuple('Validators', ['etag', 'last_modified', 'exact'])
+
+
+class ConditionalGetMixin:
+    """
+    Adds validators and 304 responses to ``list`` and ``retrieve``.
+    
+    Views narrow what the validators cover with ``get_validator_queryset``,
+    add columns with ``get_validator_fields`` and name the versions of
+    embedded data with ``get_validator_versions``. Responses that need
+    versions only get validators when the cache is shared. Lists only get an
+    ETag: the page's ids and links catch deletions, which a Last-Modified
+    date cannot.
+    """
+    response_validators = None
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+    
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset.select_related(None).prefetch_related(None).order_by()
+    
+    def get_validator_fields(self):
+        return ['id', 'updated_at']
+    
+    def get_validator_rows(self):
+        """
+        The validator fields of the object, or of the page of a paginated
+        list, as dicts.
+        """
+        queryset = self.get_validator_queryset()
+        fields = set(self.get_validator_fields())
+        if self.detail or self.paginator is None:
+            return list(queryset.values(*fields))
+        # Cursor pagination reads the row's position from the ordering fields
+        if hasattr(self.paginator, 'get_ordering'):
+            fields.update(name.lstrip('-') for name in self.paginator.get_ordering(self.request, queryset, self))
+        return self.paginator.paginate_queryset(queryset.values(*fields), self.request, view=self)
+    
+    def get_validator_versions(self, rows):
+        """
+        Cached version numbers of other data the response embeds, given the
+        rows the validators cover.
+        """
+        return []
+    
+    def get_validators(self):
+        try:
+            rows = self.get_validator_rows()
+        except (DjangoValidationError, ValueError, TypeError, NotFound):
+            # Malformed lookup or cursor; the view itself answers with 404
+            return None
+        if self.detail and not rows:
+            return None
+        
+        links = []
+        if not self.detail and self.paginator is not None:
+            links = [self.paginator.get_next_link(), self.paginator.get_previous_link()]
+        versions = self.get_validator_versions(rows)
+        if versions and not cache_is_shared():
+            # Counters in a per-process cache miss changes made by other processes
+            return None
+        request = self.request
+        parts = [
+            type(self).__name__, self.get_serializer_class().__name__, request.get_full_path(),
+            request.accepted_media_type, request.user.pk, [sorted(row.items()) for row in rows], links, versions,
+        ]
+        digest = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+        last_modified = rows[0]['updated_at'] if self.detail else None
+        return Validators(f'"{digest}"', last_modified, exact=not versions)
+    
+    def is_not_modified(self, request, validators):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            if if_none_match.strip() == '*':
+                return True
+            return validators.etag in [etag.removeprefix('W/') for etag in parse_etags(if_none_match)]
+        if validators.last_modified is not None and validators.exact:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+            return since is not None and int(validators.last_modified.timestamp()) <= since
+        return False
+    
+    def response_cache_key(self, validators):
+        return 'response:' + validators.etag.strip('"')
+    
+    def conditional_response(self, handler, request, *args, **kwargs):
+        self.response_validators = validators = self.get_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        
+        if self.is_not_modified(request, validators):
+            return HttpResponseNotModified()
+        
+        if get_setting('CACHE_RESPONSES'):
+            cached = cache.get(self.response_cache_key(validators))
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+        
+        return handler(request, *args, **kwargs)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = self.response_validators
+        if validators is None or response.status_code not in (200, 304):
+            return response
+        
+        response['ETag'] = validators.etag
+        if validators.last_modified is not None:
+            response['Last-Modified'] = http_date(validators.last_modified.timestamp())
+        patch_cache_control(response, no_cache=True)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        # Bodies differ per user, so shared caches must key on the credentials
+        patch_vary_headers(response, ('Authorization',))
+        
+        if (response.status_code == 200 and isinstance(response, Response) and get_setting('CACHE_RESPONSES')
+                and request.accepted_renderer.format == 'json'):
+            key = self.response_cache_key(validators)
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, (rendered.content, rendered['Content-Type']),
+                                           timeout=get_setting('CACHE_TIMEOUT'))
+            )
+        return response
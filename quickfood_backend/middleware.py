@@ -0,0 +1,198 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware records the number of queries, time spent in the
+database, time spent producing serializer ``.data`` and total time for every
+request. It reports them as a ``Server-Timing`` header (when enabled) and as
+fields on a ``quickfood.requests`` log record. A configurable fraction of
+requests can also be run under cProfile.
+"""
+import cProfile
+import logging
+import random
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('quickfood.requests')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'SLOW_REQUEST_MS': 2000,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_DIR': 'profiles',
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'REQUEST_METRICS', {}).get(name, DEFAULTS[name])
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serializer_time', '_serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+
+def current_metrics():
+    """
+    Metrics of the request being handled, or ``None`` outside a request.
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(connection):
+    # Wrappers live as long as the connection object, which survives reconnects
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+def install_serializer_timing():
+    """
+    Time top-level ``serializer.data`` calls. ``Serializer.data`` and
+    ``ListSerializer.data`` both go through ``BaseSerializer.data``, so
+    wrapping it covers every serializer; nested serializers are part of
+    their parent's time.
+    """
+    original = BaseSerializer.data
+    if getattr(original.fget, 'records_metrics', False):
+        return
+
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics._serializer_depth:
+            return original.fget(self)
+        metrics._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics._serializer_depth -= 1
+
+    data.records_metrics = True
+    BaseSerializer.data = property(data)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_serializer_timing()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_setting('ENABLED'):
+            return self.get_response(request)
+
+        # Connections opened before the middleware was loaded missed the signal
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+        metrics, token, profiler, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = self.stop(token, profiler, start)
+        self.report(request, response, metrics, total, profiler)
+        return response
+
+    async def __acall__(self, request):
+        if not get_setting('ENABLED'):
+            return await self.get_response(request)
+
+        metrics, token, profiler, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            total = self.stop(token, profiler, start)
+        self.report(request, response, metrics, total, profiler)
+        return response
+
+    def start(self):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        profiler = None
+        rate = get_setting('PROFILE_SAMPLE_RATE')
+        if rate and random.random() < rate:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return metrics, token, profiler, time.perf_counter()
+
+    def stop(self, token, profiler, start):
+        total = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        _current.reset(token)
+        return total
+
+    def report(self, request, response, metrics, total, profiler):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else None
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+
+        if profiler is not None:
+            fields['profile'] = str(self.save_profile(profiler, view))
+
+        if get_setting('SERVER_TIMING'):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={fields["db_ms"]};desc="{metrics.queries} queries"',
+                f'serializer;dur={fields["serializer_ms"]}',
+                f'total;dur={fields["total_ms"]}',
+            ])
+
+        level = logging.WARNING if fields['total_ms'] >= get_setting('SLOW_REQUEST_MS') else logging.INFO
+        logger.log(level, '%s %s %s', request.method, request.path, response.status_code, extra=fields)
+
+    def save_profile(self, profiler, view):
+        directory = Path(get_setting('PROFILE_DIR'))
+        directory.mkdir(parents=True, exist_ok=True)
+        name = (view or 'unresolved').replace(':', '.').replace('/', '.')
+        path = directory / f'{time.strftime("%Y%m%dT%H%M%S")}-{name}-{random.randrange(16 ** 6):06x}.prof'
+        profiler.dump_stats(path)
+        return path
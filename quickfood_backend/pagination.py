@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is fetched with a WHERE on the cursor position instead of an
+    OFFSET, so deep pages cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page size handling for search results, which are ranked and so paged by
+    number. Like the cursor pagination, an invalid ``page_size`` falls back
+    to the default and large ones are capped.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
@@ -59,9 +59,12 @@ INSTALLED_APPS = [
     'accounts',
     'restaurants',
     'orders',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole request
+    'quickfood_backend.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -116,6 +119,55 @@ DATABASES = {
     )
 }
 
+# Cache
+# A shared cache (Redis) is used when REDIS_URL is set; otherwise each process keeps its own.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'throttle',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttle',
+        },
+    }
+
+# Whether every process shares the default cache. Menu caching, version based
+# ETags and trusted JWT claims rely on it; None detects it from the backend
+# (local-memory caches are per process)
+SHARED_CACHE = None
+
+# Rate-limit counters (quickfood_backend.throttling); a local-memory cache
+# limits per process, a shared one across processes
+THROTTLE_CACHE = 'throttle'
+
+# Rendered restaurant menus are cached per menu version for this many seconds
+MENU_CACHE_TIMEOUT = 60 * 60 * 24
+
+# ETag/Last-Modified on restaurant, menu item and order list/retrieve
+# (quickfood_backend.conditional). CACHE_RESPONSES also keeps rendered JSON
+# bodies per user under their ETag for CACHE_TIMEOUT seconds.
+CONDITIONAL_REQUESTS = {
+    'CACHE_RESPONSES': os.getenv('CACHE_API_RESPONSES', 'False') == 'True',
+    'CACHE_TIMEOUT': 300,
+}
+
+# Radius limits (km) for GET /api/restaurants/restaurant/near/
+NEARBY_DEFAULT_RADIUS_KM = 3
+NEARBY_MAX_RADIUS_KM = 50
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -156,6 +208,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized copies generated for restaurant and menu item images (max width, max height)
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 360),
+    'full': (1280, 1280),
+}
+IMAGE_VARIANT_FORMAT = 'WEBP'
+IMAGE_VARIANT_QUALITY = 80
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -166,13 +227,30 @@ AUTH_USER_MODEL = 'accounts.User'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # Read-only requests authenticate from the JWT claims alone; everything
+    # else loads the user through a small per-process cache
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',  # Add this line
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'quickfood_backend.throttling.UserRateThrottle',
+        'quickfood_backend.throttling.AnonRateThrottle',
+        'quickfood_backend.throttling.ScopedRateThrottle',
+    ],
+    # Sliding-window limits: "user"/"anon" cover every request, the rest
+    # are per endpoint scope (see ScopedRateThrottle)
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_RATE_USER', '1200/min'),
+        'anon': os.getenv('THROTTLE_RATE_ANON', '300/min'),
+        'reads': '600/min',
+        'login': '10/min',
+        'register': '5/min',
+        'order_create': '30/min',
+    },
 }
 
 # JWT settings
@@ -191,5 +269,85 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Passwords are checked on a pool that hashes at most WORKERS passwords at a
+# time per process; up to MAX_PENDING more may wait QUEUE_TIMEOUT seconds,
+# and anything beyond that is answered with 503 and Retry-After
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledHashingBackend']
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.getenv('PASSWORD_HASHING_WORKERS', 2)),
+    'MAX_PENDING': int(os.getenv('PASSWORD_HASHING_MAX_PENDING', 16)),
+    'QUEUE_TIMEOUT': 5,
+    'RETRY_AFTER': 1,
+}
+
+# Per-process cache of authenticated users (accounts.authentication); entries
+# are dropped on change in this process and after TIMEOUT seconds elsewhere.
+# Read requests trust JWT claims only when TRUST_CLAIMS is true; None means
+# only when the default cache is shared (Redis), so every process sees changes.
+AUTH_USER_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 30,
+    'TRUST_CLAIMS': None,
+}
+
+# Idempotency-Key handling for order creation
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)
+
+# Delivered and cancelled orders older than this are moved to the archive tables
+ORDER_ARCHIVE_AFTER = timedelta(days=90)
+ORDER_ARCHIVE_BATCH_SIZE = 500
+
+# Background job worker (python manage.py run_jobs)
+JOBS = {
+    'CONCURRENCY': int(os.getenv('JOBS_CONCURRENCY', 4)),
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5,
+    'BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 300,
+    # Seconds to keep finished jobs before purge_jobs deletes them
+    'DONE_RETENTION': 7 * 24 * 3600,
+    'FAILED_RETENTION': 30 * 24 * 3600,
+}
+
+# Per-request query count, DB/serializer/total time (quickfood_backend.middleware).
+# Logged on "quickfood.requests"; requests slower than SLOW_REQUEST_MS log a
+# warning. SERVER_TIMING adds the numbers as a response header, and a
+# PROFILE_SAMPLE_RATE fraction of requests is profiled into PROFILE_DIR.
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS', 'True') == 'True',
+    'SERVER_TIMING': os.getenv('SERVER_TIMING', str(DEBUG)) == 'True',
+    'SLOW_REQUEST_MS': 2000,
+    'PROFILE_SAMPLE_RATE': float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    'PROFILE_DIR': os.getenv('PROFILE_DIR', BASE_DIR / 'profiles'),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'request_metrics': {
+            'format': '%(asctime)s %(levelname)s %(message)s view=%(view)s queries=%(queries)s '
+                      'db_ms=%(db_ms)s serializer_ms=%(serializer_ms)s total_ms=%(total_ms)s',
+        },
+    },
+    'handlers': {
+        'request_metrics': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'request_metrics',
+        },
+    },
+    'loggers': {
+        'quickfood.requests': {
+            'handlers': ['request_metrics'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO' if DEBUG else 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
@@ -0,0 +1,28 @@
+"""
+Test helpers shared by the apps' test suites.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    ``assertQueryBudget`` fails a test when an endpoint runs more queries than
+    it is allowed, at every data size the test grows to, so an N+1 shows up
+    as soon as it is introduced rather than in production.
+    """
+    def assertQueryBudget(self, budget, request, grow=None, sizes=(1, 5, 20)):
+        """
+        Call ``request()`` once per size in ``sizes``, calling ``grow(size)``
+        first to bring the data up to that size, and check each call ran at
+        most ``budget`` queries.
+        """
+        for size in sizes:
+            if grow is not None:
+                grow(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            if len(queries) > budget:
+                statements = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries, 1))
+                self.fail(f'{len(queries)} queries at size {size}, budget is {budget}:\n{statements}')
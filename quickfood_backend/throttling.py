@@ -0,0 +1,149 @@
+"""
+Sliding-window rate limits for the API.
+
+Each limit keeps two counters per client: one for the current fixed window
+and one for the previous window. The rate is estimated as the previous count,
+weighted by how much of that window still overlaps the sliding window, plus
+the current count. That is a close approximation of a true sliding window at
+O(1) cost per request and constant memory per client. DRF's
+SimpleRateThrottle instead stores and scans a timestamp for every request.
+
+Counters live in the cache named by ``THROTTLE_CACHE``. A local-memory cache
+limits each process separately; a shared (Redis) cache limits across every
+process. Rates come from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``.
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def get_throttle_cache():
+    return caches[settings.THROTTLE_CACHE]
+
+
+def reset_throttles():
+    get_throttle_cache().clear()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, offset = divmod(self.timer(), self.duration)
+        current_key = f'{self.key}:{int(window)}'
+        previous_key = f'{self.key}:{int(window) - 1}'
+
+        store = get_throttle_cache()
+        counts = store.get_many([previous_key, current_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+
+        if previous * (1 - offset / self.duration) + current >= self.num_requests:
+            self.retry_after = self.time_until_allowed(previous, current, offset)
+            return False
+
+        # Counters outlive their window by one more, while they are the "previous" one
+        if not store.add(current_key, 1, timeout=2 * self.duration):
+            try:
+                store.incr(current_key)
+            except ValueError:
+                store.set(current_key, 1, timeout=2 * self.duration)
+        return True
+
+    def time_until_allowed(self, previous, current, offset):
+        limit = self.num_requests
+        duration = self.duration
+        if current < limit and previous:
+            # Within this window the previous window's share keeps shrinking
+            wait = duration * (1 - (limit - current) / previous) - offset
+            if wait < duration - offset:
+                return max(wait, 0)
+        # Otherwise this window's count becomes the shrinking "previous" one
+        share = max(0, 1 - limit / current) if current else 0
+        return duration - offset + duration * share
+
+    def wait(self):
+        return math.ceil(getattr(self, 'retry_after', 0)) or 1
+
+
+class UserRateThrottle(SlidingWindowThrottle):
+    """
+    Overall limit per authenticated user.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class AnonRateThrottle(SlidingWindowThrottle):
+    """
+    Overall limit per client IP for unauthenticated requests.
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class ScopedRateThrottle(SlidingWindowThrottle):
+    """
+    Per-endpoint limits, keyed by user (or IP when anonymous). The scope is
+    taken from the view's ``throttle_scopes`` by action, then its
+    ``throttle_scope``; other read requests fall under ``reads``. Views
+    without a scope, or scopes without a configured rate, are not limited.
+    """
+    def __init__(self):
+        # The rate depends on the view, so it is resolved per request
+        pass
+
+    def allow_request(self, request, view):
+        return self.allow_scope(request, self.get_scope(request, view))
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(getattr(view, 'action', None))
+        scope = scope or getattr(view, 'throttle_scope', None)
+        if scope is None and request.method in SAFE_METHODS:
+            scope = 'reads'
+        return scope
+
+    def allow_scope(self, request, scope):
+        if scope is None or scope not in self.THROTTLE_RATES:
+            return True
+        self.scope = scope
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, None)
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, 'user', None)
+        if user and user.is_authenticated:
+            ident = f'user-{user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def check_throttle(request, scope):
+    """
+    Apply the ``scope`` limit to a plain Django view. Returns the seconds to
+    wait when the request is over the limit, otherwise ``None``.
+    """
+    throttle = ScopedRateThrottle()
+    if throttle.allow_scope(request, scope):
+        return None
+    return throttle.wait()
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from quickfood_backend.conditional import bump_version, get_version
+
+# Bumped with every restaurant's menu version, for responses that embed
+# restaurant or menu data from many restaurants
+ALL_MENUS_VERSION_KEY = 'menu:version:all'
+
+
+def get_menu_cache_timeout():
+    return getattr(settings, 'MENU_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def menu_version_key(restaurant_id):
+    return f'menu:version:{restaurant_id}'
+
+
+def menu_body_key(restaurant_id, version):
+    return f'menu:body:{restaurant_id}:{version}'
+
+
+def get_menu_version(restaurant_id):
+    return get_version(menu_version_key(restaurant_id))
+
+
+def get_all_menus_version():
+    return get_version(ALL_MENUS_VERSION_KEY)
+
+
+def bump_menu_version(restaurant_id):
+    bump_version(menu_version_key(restaurant_id))
+    bump_version(ALL_MENUS_VERSION_KEY)
+
+
+def invalidate_menu(restaurant_id):
+    """
+    Retire the cached menu once the current transaction commits, so a
+    concurrent reader cannot cache pre-commit data under the new version.
+    """
+    transaction.on_commit(lambda: bump_menu_version(restaurant_id))
+
+
+def menu_etag(restaurant_id, version):
+    return f'"menu-{restaurant_id}-{version}"'
+
+
+def get_cached_menu(restaurant_id, version):
+    return cache.get(menu_body_key(restaurant_id, version))
+
+
+def set_cached_menu(restaurant_id, version, body):
+    cache.set(menu_body_key(restaurant_id, version), body, timeout=get_menu_cache_timeout())
@@ -0,0 +1,154 @@
+import math
+
+from django.db.models import Q
+
+# Geohash cells nest by prefix, so an index on the column answers "which
+# rows are in this cell" as a plain range scan on any database
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        bounds, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    Return the ``(latitude, longitude)`` size in degrees of a cell at
+    ``precision`` characters.
+    """
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return ``(min_lat, max_lat, min_lng, max_lng)`` enclosing the circle,
+    or ``None`` for the longitude bounds when it spans a pole or the
+    antimeridian.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+    lng_delta = radius_km / (KM_PER_DEGREE * math.cos(math.radians(max(abs(min_lat), abs(max_lat)))))
+    min_lng, max_lng = longitude - lng_delta, longitude + lng_delta
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Return geohash prefixes whose cells together cover the circle: the cell
+    containing the point and its neighbours, at the finest precision where a
+    cell is still at least ``radius_km`` across.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    if min_lng is None:
+        return ['']
+    lat_span = max_lat - latitude
+    lng_span = max_lng - longitude
+    
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        lat_size, lng_size = cell_size(candidate)
+        if lat_size < lat_span or lng_size < lng_span:
+            break
+        precision = candidate
+    if precision == 0:
+        return ['']
+    
+    lat_size, lng_size = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            lat = min(max(latitude + lat_step * lat_size, -90.0), 90.0)
+            lng = (longitude + lng_step * lng_size + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def prefix_upper_bound(prefix):
+    """
+    Return the smallest geohash greater than every hash starting with
+    ``prefix``, or ``None`` if there is none.
+    """
+    while prefix:
+        position = BASE32.index(prefix[-1])
+        if position + 1 < len(BASE32):
+            return prefix[:-1] + BASE32[position + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def cell_filter(cells, field='geohash'):
+    """
+    Build a ``Q`` matching rows inside any of ``cells``, expressed as ranges
+    so an ordinary B-tree index on ``field`` is used.
+    """
+    condition = Q()
+    for prefix in cells:
+        if not prefix:
+            return Q(**{f'{field}__gt': ''})
+        cell = Q(**{f'{field}__gte': prefix})
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            cell &= Q(**{f'{field}__lt': upper})
+        condition |= cell
+    return condition
+
+
+def nearby_ids(queryset, latitude, longitude, radius_km, limit):
+    """
+    Return up to ``limit`` ``(id, distance_km)`` pairs for rows of
+    ``queryset`` within ``radius_km`` of the point, nearest first.
+    Candidates come from the geohash index and a bounding box; only their
+    coordinates are loaded to compute exact distances.
+    """
+    queryset = queryset.filter(cell_filter(covering_cells(latitude, longitude, radius_km)))
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lng is not None:
+        queryset = queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    
+    results = []
+    for pk, lat, lng in queryset.order_by().values_list('pk', 'latitude', 'longitude').iterator():
+        distance = haversine_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            results.append((pk, distance))
+    results.sort(key=lambda result: (result[1], result[0]))
+    return results[:limit]
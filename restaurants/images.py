@@ -0,0 +1,81 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DEFAULT_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 360),
+    'full': (1280, 1280),
+}
+
+
+def get_variant_sizes():
+    return getattr(settings, 'IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def get_variant_format():
+    return getattr(settings, 'IMAGE_VARIANT_FORMAT', 'WEBP')
+
+
+def get_variant_quality():
+    return getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+
+
+def render_variant(source, size):
+    """
+    Downscale ``source`` (a PIL image) to fit within ``size`` and encode it.
+    """
+    image = source.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format=get_variant_format(), quality=get_variant_quality(), method=4)
+    return buffer.getvalue()
+
+
+def generate_variants(image_field):
+    """
+    Build every configured variant of ``image_field`` and store them under
+    content-hashed names. Files that already exist are reused, so running
+    this again for the same upload does no extra writes.
+    Returns the mapping to store in ``image_variants``.
+    """
+    image_field.open('rb')
+    try:
+        source = Image.open(image_field)
+        source = ImageOps.exif_transpose(source)
+        source = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    finally:
+        image_field.close()
+    
+    directory = os.path.join(os.path.dirname(image_field.name), 'variants')
+    extension = get_variant_format().lower()
+    variants = {'source': image_field.name}
+    for name, size in get_variant_sizes().items():
+        content = render_variant(source, size)
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        path = os.path.join(directory, f'{digest}-{name}.{extension}')
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        variants[name] = path
+    return variants
+
+
+def variant_urls(instance, request=None):
+    """
+    URLs of the variants that match the instance's current image.
+    """
+    variants = instance.image_variants or {}
+    if not instance.image or variants.get('source') != instance.image.name:
+        return {}
+    
+    urls = {}
+    for name in get_variant_sizes():
+        if name in variants:
+            url = default_storage.url(variants[name])
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+    return urls
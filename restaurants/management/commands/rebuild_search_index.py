@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite full-text search tables (PostgreSQL keeps its search vectors up to date itself).'
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_menu
+from .models import MenuItem
+from .search import index_instances
+from .serializers import MenuItemSerializer
+
+IMPORT_FIELDS = ('id', 'name', 'description', 'price', 'is_available')
+EXPORT_FIELDS = ('id', 'name', 'description', 'price', 'is_available')
+BATCH_SIZE = 500
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+
+class MenuImportError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def parse_csv_rows(text):
+    """
+    Turn CSV text with a header row into row dicts, dropping empty cells so
+    they fall back to defaults (or to the current value on update).
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    rows = []
+    for row in reader:
+        cleaned = {}
+        for key, value in row.items():
+            if key is None or value is None:
+                continue
+            key, value = key.strip(), value.strip()
+            if value == '':
+                continue
+            if key == 'is_available':
+                lowered = value.lower()
+                value = True if lowered in TRUE_VALUES else False if lowered in FALSE_VALUES else value
+            cleaned[key] = value
+        rows.append(cleaned)
+    return rows
+
+
+def import_menu(restaurant, rows, deactivate_missing=False):
+    """
+    Create or update ``restaurant``'s menu items from ``rows`` in one
+    transaction. Rows are matched to existing items by ``id`` or else by
+    name (case-insensitive); each item and name may appear only once. With
+    ``deactivate_missing`` every existing item not present in the import is
+    marked unavailable.
+
+    Raises MenuImportError with per-row errors, applying nothing, if any row
+    is invalid. Returns counts of created, updated and deactivated items.
+    """
+    existing = list(MenuItem.objects.filter(restaurant=restaurant))
+    by_id = {item.id: item for item in existing}
+    by_name = {item.name.lower(): item for item in existing}
+    
+    to_create, to_update, errors = [], [], []
+    touched = set()
+    # Names of the items earlier rows created or updated, lowercased
+    seen_names = set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        row = {key: value for key, value in row.items() if key in IMPORT_FIELDS}
+        
+        item = None
+        if row.get('id') not in (None, ''):
+            try:
+                item = by_id.get(int(row['id']))
+            except (TypeError, ValueError):
+                item = None
+            if item is None:
+                errors.append({"row": index, "errors": {"id": [f"No menu item {row['id']} in this restaurant."]}})
+                continue
+        elif row.get('name'):
+            item = by_name.get(str(row['name']).strip().lower())
+        
+        if row.get('name'):
+            name = str(row['name']).strip().lower()
+        else:
+            name = item.name.lower() if item is not None else None
+        if (item is not None and item.id in touched) or (name and name in seen_names):
+            errors.append({"row": index, "errors": {"non_field_errors": ["Item appears more than once."]}})
+            continue
+        
+        serializer = MenuItemSerializer(item, data=row, partial=item is not None)
+        if not serializer.is_valid():
+            errors.append({"row": index, "errors": serializer.errors})
+            continue
+        
+        if item is None:
+            item = MenuItem(restaurant=restaurant, **serializer.validated_data)
+            to_create.append(item)
+        else:
+            for field, value in serializer.validated_data.items():
+                setattr(item, field, value)
+            to_update.append(item)
+            touched.add(item.id)
+        seen_names.add(name)
+    
+    if errors:
+        raise MenuImportError(errors)
+    
+    to_deactivate = []
+    if deactivate_missing:
+        to_deactivate = [item for item in existing if item.id not in touched and item.is_available]
+        for item in to_deactivate:
+            item.is_available = False
+    
+    now = timezone.now()
+    for item in to_update + to_deactivate:
+        item.updated_at = now
+    
+    with transaction.atomic():
+        MenuItem.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        if to_update or to_deactivate:
+            MenuItem.objects.bulk_update(
+                to_update + to_deactivate,
+                ['name', 'description', 'price', 'is_available', 'updated_at'],
+                batch_size=BATCH_SIZE,
+            )
+        # bulk operations send no signals, so refresh the search index and menu cache here
+        index_instances(MenuItem, to_create + to_update)
+        invalidate_menu(restaurant.id)
+    
+    return {"created": len(to_create), "updated": len(to_update), "deactivated": len(to_deactivate)}
+
+
+def export_menu_csv(queryset):
+    """
+    Yield the menu as CSV lines without loading it all into memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+    
+    writer.writerow(EXPORT_FIELDS)
+    yield flush()
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        writer.writerow(row)
+        yield flush()
+
+
+def export_menu_json(queryset):
+    yield '['
+    for index, row in enumerate(queryset.values(*EXPORT_FIELDS).iterator(chunk_size=BATCH_SIZE)):
+        yield (',' if index else '') + json.dumps(row, default=str)
+    yield ']'
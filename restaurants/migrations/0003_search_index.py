@@ -0,0 +1,71 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE restaurants_restaurant ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(address, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX restaurant_search_idx ON restaurants_restaurant USING GIN (search_vector)",
+    """
+    ALTER TABLE restaurants_menuitem ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX menuitem_search_idx ON restaurants_menuitem USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS menuitem_search_idx",
+    "ALTER TABLE restaurants_menuitem DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS restaurant_search_idx",
+    "ALTER TABLE restaurants_restaurant DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def sqlite_fts(table, columns):
+    """
+    FTS5 table holding a copy of ``columns`` of ``table`` keyed by row ID.
+    It is kept in sync from the model save/delete signals rather than
+    triggers, because SQLite table rebuilds in later migrations drop triggers.
+    """
+    cols = ', '.join(columns)
+    return [
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5({cols}, tokenize='porter unicode61')",
+        f"INSERT INTO {table}_fts(rowid, {cols}) SELECT id, {cols} FROM {table}",
+    ]
+
+
+SQLITE_FORWARD = (
+    sqlite_fts('restaurants_restaurant', ['name', 'description', 'address'])
+    + sqlite_fts('restaurants_menuitem', ['name', 'description'])
+)
+
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS restaurants_menuitem_fts",
+    "DROP TABLE IF EXISTS restaurants_restaurant_fts",
+]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:37
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='restaurant',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_restaurant_name_ci'),
+        ),
+    ]
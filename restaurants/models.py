@@ -1,21 +1,58 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
+from .geo import encode as geohash_encode
 
 class Restaurant(models.Model):
+    # Name of the case-insensitive unique index on ``name``, used to recognise its violations
+    NAME_CONSTRAINT = 'unique_restaurant_name_ci'
+    
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='restaurants')
     name = models.CharField(max_length=100)
     description = models.TextField()
     address = models.TextField()
     phone_number = models.CharField(max_length=15)
     image = models.ImageField(upload_to='restaurants/', blank=True, null=True)
+    # Resized copies of ``image`` keyed by variant name, plus the source file they were made from
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    latitude = models.FloatField(blank=True, null=True,
+                                 validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True,
+                                  validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Geohash of the coordinates (blank without them), indexed for nearby lookups
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at'], name='restaurant_created_idx'),
+            models.Index(fields=['geohash'], name='restaurant_geohash_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='unique_restaurant_name_ci'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+    
+    def compute_geohash(self):
+        """
+        Geohash for the current coordinates. Code that writes restaurants with
+        ``bulk_create``/``bulk_update`` must set ``geohash`` from this itself.
+        """
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geohash_encode(self.latitude, self.longitude)
 
 class MenuItem(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_items')
@@ -23,9 +60,15 @@ class MenuItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='menu_items/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', '-created_at'], name='menuitem_rest_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.restaurant.name}"
@@ -0,0 +1,12 @@
+from rest_framework.parsers import BaseParser
+
+
+class CSVTextParser(BaseParser):
+    """
+    Accepts a raw ``text/csv`` request body and returns it as text.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return stream.read().decode(encoding)
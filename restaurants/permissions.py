@@ -1,4 +1,37 @@
 from rest_framework import permissions
+from .models import Restaurant
+
+def owned_restaurant_ids(request):
+    """
+    IDs of the restaurants the caller owns, loaded with one query the first
+    time a request needs them and reused for every later check.
+    """
+    user = request.user
+    if not user.is_authenticated or user.role != 'restaurant_owner':
+        return frozenset()
+    
+    owned = getattr(request, '_owned_restaurant_ids', None)
+    if owned is None:
+        owned = frozenset(Restaurant.objects.filter(owner_id=user.id).order_by().values_list('id', flat=True))
+        request._owned_restaurant_ids = owned
+    return owned
+
+def owns_restaurant_of(request, obj):
+    """
+    Whether the caller owns the restaurant ``obj`` belongs to, using only
+    values already loaded with ``obj``: a ``restaurant_owner_id`` annotation
+    or a selected ``restaurant``, else the per-request set of owned IDs.
+    """
+    user = request.user
+    if not user.is_authenticated or user.role != 'restaurant_owner':
+        return False
+    
+    owner_id = getattr(obj, 'restaurant_owner_id', None)
+    if owner_id is None and type(obj).restaurant.is_cached(obj):
+        owner_id = obj.restaurant.owner_id
+    if owner_id is not None:
+        return owner_id == user.id
+    return obj.restaurant_id in owned_restaurant_ids(request)
 
 class IsRestaurantOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -10,7 +43,7 @@ class IsRestaurantOwnerOrReadOnly(permissions.BasePermission):
             return True
         
         # Write permissions are only allowed to the restaurant owner
-        return obj.owner == request.user and request.user.role == 'restaurant_owner'
+        return obj.owner_id == request.user.id and request.user.role == 'restaurant_owner'
 
 class IsMenuItemOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -22,4 +55,4 @@ class IsMenuItemOwnerOrReadOnly(permissions.BasePermission):
             return True
         
         # Write permissions are only allowed to the restaurant owner
-        return obj.restaurant.owner == request.user and request.user.role == 'restaurant_owner'
\ No newline at end of file
+        return owns_restaurant_of(request, obj)
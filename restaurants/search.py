@@ -0,0 +1,154 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Restaurant, MenuItem
+
+# Columns indexed for each model, most relevant first
+SEARCH_COLUMNS = {
+    Restaurant: ('name', 'description', 'address'),
+    MenuItem: ('name', 'description'),
+}
+
+MAX_TERMS = 8
+
+
+def search_terms(query):
+    """
+    Split user input into plain word tokens, so it can be passed to the
+    full-text query syntax of either database without escaping issues.
+    """
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def search_ids(model, terms, limit, offset=0, extra_where='', extra_params=()):
+    """
+    Return ``[(id, rank), ...]`` for rows matching every term (the last one as
+    a prefix), best match first.
+    """
+    table = model._meta.db_table
+    vendor = connection.vendor
+    
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' if i == len(terms) - 1 else term for i, term in enumerate(terms))
+        sql = (
+            f"SELECT t.id, ts_rank(t.search_vector, q.query) AS rank "
+            f"FROM {table} t, to_tsquery('english', %s) AS q(query) "
+            f"WHERE t.search_vector @@ q.query {extra_where} "
+            f"ORDER BY rank DESC, t.id LIMIT %s OFFSET %s"
+        )
+        params = [tsquery, *extra_params, limit, offset]
+    elif vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' if i == len(terms) - 1 else f'"{term}"' for i, term in enumerate(terms))
+        # bm25() is lower for better matches; weight name above the other columns
+        weights = ', '.join(['10.0'] + ['1.0'] * (len(SEARCH_COLUMNS[model]) - 1))
+        sql = (
+            f"SELECT t.id, -bm25({fts_table(model)}, {weights}) AS rank "
+            f"FROM {fts_table(model)} JOIN {table} t ON t.id = {fts_table(model)}.rowid "
+            f"WHERE {fts_table(model)} MATCH %s {extra_where} "
+            f"ORDER BY rank DESC, t.id LIMIT %s OFFSET %s"
+        )
+        params = [match, *extra_params, limit, offset]
+    else:
+        # No full-text index on this backend; fall back to unranked matching
+        condition = Q()
+        for term in terms:
+            condition &= Q(*[Q(**{f'{column}__icontains': term}) for column in SEARCH_COLUMNS[model]],
+                           _connector=Q.OR)
+        queryset = model.objects.filter(condition)
+        if model is MenuItem:
+            queryset = queryset.filter(is_available=True)
+        ids = queryset.order_by('id').values_list('id', flat=True)[offset:offset + limit]
+        return [(pk, 0.0) for pk in ids]
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(model, query, limit, offset=0):
+    """
+    Ranked full-text search. Returns ``[(instance, rank), ...]``.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    
+    extra_where = 'AND t.is_available = %s' if model is MenuItem else ''
+    extra_params = (True,) if model is MenuItem else ()
+    rows = search_ids(model, terms, limit, offset, extra_where, extra_params)
+    
+    queryset = model.objects.all()
+    if model is MenuItem:
+        queryset = queryset.select_related('restaurant')
+    objects = queryset.in_bulk([pk for pk, _ in rows])
+    return [(objects[pk], rank) for pk, rank in rows if pk in objects]
+
+
+def index_instance(instance):
+    """
+    Refresh the SQLite FTS row for ``instance``. PostgreSQL keeps its search
+    vector in a generated column, so nothing is needed there.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    columns = SEARCH_COLUMNS[type(instance)]
+    table = fts_table(type(instance))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+        cursor.execute(
+            f"INSERT INTO {table}(rowid, {', '.join(columns)}) VALUES (%s{', %s' * len(columns)})",
+            [instance.pk, *[getattr(instance, column) for column in columns]],
+        )
+
+
+def index_instances(model, instances, batch_size=500):
+    """
+    Refresh the SQLite FTS rows for many instances of ``model`` at once, for
+    bulk writes that do not send save signals.
+    """
+    if connection.vendor != 'sqlite' or not instances:
+        return
+    columns = SEARCH_COLUMNS[model]
+    table = fts_table(model)
+    placeholders = '(' + ', '.join(['%s'] * (len(columns) + 1)) + ')'
+    with connection.cursor() as cursor:
+        for start in range(0, len(instances), batch_size):
+            batch = instances[start:start + batch_size]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE rowid IN ({', '.join(['%s'] * len(batch))})",
+                [instance.pk for instance in batch],
+            )
+            cursor.execute(
+                f"INSERT INTO {table}(rowid, {', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))}",
+                [value for instance in batch
+                 for value in (instance.pk, *[getattr(instance, column) for column in columns])],
+            )
+
+
+def unindex_instance(model, pk):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {fts_table(model)} WHERE rowid = %s", [pk])
+
+
+@transaction.atomic
+def rebuild_search_index():
+    """
+    Repopulate the SQLite FTS tables after bulk writes that bypass signals.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for model, columns in SEARCH_COLUMNS.items():
+            cols = ', '.join(columns)
+            cursor.execute(f"DELETE FROM {fts_table(model)}")
+            cursor.execute(
+                f"INSERT INTO {fts_table(model)}(rowid, {cols}) SELECT id, {cols} FROM {model._meta.db_table}"
+            )
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Restaurant, MenuItem
+from .images import variant_urls
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -9,20 +10,68 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username')
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    URLs of the resized image variants (thumbnail, card, full); empty until
+    they have been generated.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+    
+    def to_representation(self, instance):
+        return variant_urls(instance, self.context.get('request'))
+
 class MenuItemSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    
     class Meta:
         model = MenuItem
-        fields = ('id', 'name', 'description', 'price', 'image', 'is_available')
+        fields = ('id', 'name', 'description', 'price', 'image', 'image_variants', 'is_available')
 
 class RestaurantSerializer(serializers.ModelSerializer):
+    """
+    Full restaurant representation by default. Passing ``fields`` and/or
+    ``expand`` narrows it: ``fields`` picks plain fields (the summary set when
+    omitted) and ``expand`` adds the nested ``menu_items``/``owner``.
+    """
     menu_items = MenuItemSerializer(many=True, read_only=True)
     owner = UserSerializer(read_only=True)
+    image_variants = ImageVariantsField()
+    
+    SUMMARY_FIELDS = ('id', 'name', 'image', 'image_variants', 'address')
+    EXPANDABLE_FIELDS = ('menu_items', 'owner')
     
     class Meta:
         model = Restaurant
-        fields = ('id', 'name', 'description', 'address', 'phone_number', 'image', 'menu_items', 'created_at', 'owner')
+        fields = ('id', 'name', 'description', 'address', 'phone_number', 'image', 'image_variants',
+                  'latitude', 'longitude', 'menu_items', 'created_at', 'owner')
         read_only_fields = ('id', 'created_at')
     
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        
+        selected = set(fields or self.SUMMARY_FIELDS) | set(expand or ())
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+    
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Latitude and longitude must be provided together.")
+        return attrs
+    
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class DishSearchResultSerializer(MenuItemSerializer):
+    restaurant = serializers.IntegerField(source='restaurant_id', read_only=True)
+    restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
+    
+    class Meta(MenuItemSerializer.Meta):
+        fields = MenuItemSerializer.Meta.fields + ('restaurant', 'restaurant_name')
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_menu
+from .models import Restaurant, MenuItem
+from .search import index_instance, unindex_instance
+from jobs.queue import enqueue
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def menu_item_changed(sender, instance, **kwargs):
+    invalidate_menu(instance.restaurant_id)
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    invalidate_menu(instance.id)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+def update_search_index(sender, instance, **kwargs):
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_instance(sender, instance.pk)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+def queue_image_variants(sender, instance, **kwargs):
+    # Resizing runs in the job worker, off the request path
+    source = instance.image.name if instance.image else None
+    if source != instance.image_variants.get('source'):
+        enqueue('restaurants.generate_image_variants', {'model': sender._meta.label, 'pk': instance.pk})
@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.utils import timezone
+
+from jobs.queue import job
+
+from .cache import invalidate_menu
+from .images import generate_variants
+from .models import MenuItem
+
+
+@job('restaurants.generate_image_variants')
+def generate_image_variants(model, pk):
+    """
+    Create resized variants for a restaurant or menu item image. Does nothing
+    if the variants already match the current image.
+    """
+    model_class = apps.get_model(model)
+    instance = model_class.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    
+    if not instance.image:
+        if not instance.image_variants:
+            return
+        model_class.objects.filter(pk=pk).update(image_variants={}, updated_at=timezone.now())
+    elif instance.image_variants.get('source') == instance.image.name:
+        return
+    else:
+        variants = generate_variants(instance.image)
+        # Saved with update() so the save signal does not queue this job again;
+        # skipped if the image was replaced while the variants were generated
+        model_class.objects.filter(pk=pk, image=instance.image.name).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+    
+    invalidate_menu(instance.restaurant_id if isinstance(instance, MenuItem) else instance.pk)
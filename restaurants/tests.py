@@ -1,3 +1,639 @@
-from django.test import TestCase
+import json
+import math
+import random
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from unittest import mock
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from jobs.models import Job
+from quickfood_backend.testing import QueryBudgetMixin
+from quickfood_backend.throttling import reset_throttles
+from jobs.queue import enqueue, run_pending_jobs
+from . import geo
+from .models import Restaurant, MenuItem
+from .permissions import owned_restaurant_ids, owns_restaurant_of
+
+User = get_user_model()
+
+
+class RestaurantTestMixin:
+    def setUp(self):
+        reset_throttles()
+        self.owner = User.objects.create_user(username='owner', password='pass', role='restaurant_owner')
+        self.customer = User.objects.create_user(username='customer', password='pass', role='user')
+        self.restaurant = self.create_restaurant('Grill')
+        self.client = APIClient()
+
+    def create_restaurant(self, name, menu_size=3):
+        restaurant = Restaurant.objects.create(
+            owner=self.owner, name=name, description=f'{name} house', address='1 Main St', phone_number='123'
+        )
+        MenuItem.objects.bulk_create([
+            MenuItem(restaurant=restaurant, name=f'{name} dish {i}', description='Tasty', price='5.50',
+                     is_available=i != 0)
+            for i in range(menu_size)
+        ])
+        return restaurant
+
+
+class RestaurantRepresentationTests(RestaurantTestMixin, TestCase):
+    def test_list_is_summary_by_default(self):
+        response = self.client.get('/api/restaurants/restaurant/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'image', 'image_variants', 'address'})
+
+    def test_fields_and_expand(self):
+        response = self.client.get('/api/restaurants/restaurant/', {'fields': 'id,name', 'expand': 'menu_items'})
+        restaurant = response.data['results'][0]
+        self.assertEqual(set(restaurant), {'id', 'name', 'menu_items'})
+        # The unavailable dish is hidden from the public
+        self.assertEqual(len(restaurant['menu_items']), 2)
+
+    def test_owner_sees_unavailable_items(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f'/api/restaurants/restaurant/{self.restaurant.id}/')
+        self.assertEqual(len(response.data['menu_items']), 3)
+        self.assertEqual(response.data['owner']['username'], 'owner')
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/restaurants/restaurant/', {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/restaurants/restaurant/', {'expand': 'orders'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expanded_list_query_count_does_not_grow(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/restaurants/restaurant/', {'expand': 'menu_items,owner'})
+        for i in range(5):
+            self.create_restaurant(f'Place {i}', menu_size=10)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get('/api/restaurants/restaurant/', {'expand': 'menu_items,owner'})
+        self.assertEqual(len(few), len(many))
+
+
+class QueryBudgetTests(QueryBudgetMixin, RestaurantTestMixin, TestCase):
+    def grow_restaurants(self, size):
+        for i in range(Restaurant.objects.count(), size):
+            self.create_restaurant(f'Place {i}', menu_size=4)
+
+    def test_restaurant_list(self):
+        self.assertQueryBudget(3, lambda: self.client.get('/api/restaurants/restaurant/'), self.grow_restaurants)
+
+    def test_restaurant_list_expanded(self):
+        self.assertQueryBudget(4, lambda: self.client.get(
+            '/api/restaurants/restaurant/', {'expand': 'menu_items,owner'}
+        ), self.grow_restaurants)
+
+    def test_restaurant_detail_for_owner(self):
+        self.client.force_authenticate(self.owner)
+
+        def grow(size):
+            MenuItem.objects.bulk_create([
+                MenuItem(restaurant=self.restaurant, name=f'Extra {size}-{i}', description='Tasty', price='4.00')
+                for i in range(size)
+            ])
+
+        self.assertQueryBudget(3, lambda: self.client.get(f'/api/restaurants/restaurant/{self.restaurant.id}/'), grow)
+
+    def test_menu_items_list(self):
+        self.assertQueryBudget(2, lambda: self.client.get('/api/restaurants/menu-items/'), self.grow_restaurants)
+
+
+@override_settings(REQUEST_METRICS={'SERVER_TIMING': True, 'SLOW_REQUEST_MS': 2000})
+class RequestMetricsTests(RestaurantTestMixin, TestCase):
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/restaurants/restaurant/')
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serializer', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', timing['db'])
+
+    def test_log_fields(self):
+        with self.assertLogs('quickfood.requests', 'INFO') as logs:
+            self.client.get(f'/api/restaurants/restaurant/{self.restaurant.id}/')
+        record = logs.records[-1]
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(record.view, 'restaurant-detail')
+        self.assertEqual(record.status, 200)
+        self.assertGreaterEqual(record.queries, 1)
+        self.assertGreater(record.serializer_ms, 0)
+        self.assertGreaterEqual(record.total_ms, record.db_ms)
+
+    def test_slow_requests_log_a_warning(self):
+        with override_settings(REQUEST_METRICS={'SLOW_REQUEST_MS': 0}):
+            with self.assertLogs('quickfood.requests', 'WARNING'):
+                response = self.client.get('/api/restaurants/restaurant/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_sampled_requests_are_profiled(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(REQUEST_METRICS={'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_DIR': directory}):
+            with self.assertLogs('quickfood.requests', 'INFO') as logs:
+                self.client.get('/api/restaurants/restaurant/')
+        profile = logs.records[-1].profile
+        self.assertTrue(profile.startswith(directory) and profile.endswith('.prof'))
+        self.assertIn('restaurant-list', profile)
+
+
+class RestaurantNameUniquenessTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.owner)
+    
+    def test_duplicate_name_is_rejected_case_insensitively(self):
+        data = {'name': 'GRILL', 'description': 'Again', 'address': '2 Main St', 'phone_number': '456'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/restaurants/restaurant/', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['name'], 'A restaurant with this name already exists.')
+        # No separate existence check: the unique index does the work
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('SELECT') and '"restaurants_restaurant"' in query['sql']])
+        self.assertEqual(Restaurant.objects.count(), 1)
+    
+    def test_rename_onto_existing_name_is_rejected(self):
+        other = self.create_restaurant('Noodles')
+        response = self.client.patch(f'/api/restaurants/restaurant/{other.id}/', {'name': 'grill'})
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertEqual(other.name, 'Noodles')
+        
+        response = self.client.patch(f'/api/restaurants/restaurant/{other.id}/', {'name': 'NOODLES'})
+        self.assertEqual(response.status_code, 200)
+
+
+class OwnershipPermissionTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = MenuItem.objects.filter(restaurant=self.restaurant).order_by('id')[1]
+        self.url = f'/api/restaurants/menu-items/{self.item.id}/'
+    
+    def test_rejected_writes_cost_only_the_object_lookup(self):
+        intruder = User.objects.create_user(username='intruder', password='pass', role='restaurant_owner')
+        for user in (self.customer, intruder):
+            self.client.force_authenticate(user)
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.patch(self.url, {'price': '1.00'}).status_code, 403)
+            with self.assertNumQueries(1):
+                response = self.client.patch(f'/api/restaurants/restaurant/{self.restaurant.id}/', {'name': 'Mine'})
+                self.assertEqual(response.status_code, 403)
+    
+    def test_owner_write_does_not_load_restaurant_or_owner(self):
+        self.client.force_authenticate(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.patch(self.url, {'price': '1.00'}).status_code, 200)
+        for query in queries.captured_queries:
+            self.assertNotIn('FROM "restaurants_restaurant"', query['sql'])
+            self.assertNotIn('FROM "accounts_user"', query['sql'])
+    
+    def test_owned_restaurant_ids_are_loaded_once_per_request(self):
+        request = mock.Mock(user=self.owner, _owned_restaurant_ids=None)
+        other = self.create_restaurant('Noodles')
+        item = MenuItem.objects.filter(restaurant=other).only('id', 'restaurant_id').first()
+        with self.assertNumQueries(1):
+            self.assertEqual(owned_restaurant_ids(request), {self.restaurant.id, other.id})
+            self.assertTrue(owns_restaurant_of(request, item))
+            self.assertFalse(owns_restaurant_of(mock.Mock(user=self.customer), item))
+
+
+class NearbyTests(RestaurantTestMixin, TestCase):
+    # Trafalgar Square
+    LAT, LNG = 51.5080, -0.1281
+    
+    def setUp(self):
+        super().setUp()
+        # Roughly 0.5 km, 2 km and 5 km north of the search point
+        for name, lat in (('Close', 51.5125), ('Walkable', 51.5260), ('Far', 51.5530)):
+            self.create_located(name, lat, self.LNG)
+    
+    def create_located(self, name, latitude, longitude):
+        return Restaurant.objects.create(owner=self.owner, name=name, description='', address='', phone_number='1',
+                                         latitude=latitude, longitude=longitude)
+    
+    def test_nearest_first_within_radius(self):
+        response = self.client.get('/api/restaurants/restaurant/near/', {'lat': self.LAT, 'lng': self.LNG})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['name'] for r in results], ['Close', 'Walkable'])
+        self.assertAlmostEqual(results[0]['distance_km'], 0.5, delta=0.05)
+        self.assertEqual(set(results[0]), {'id', 'name', 'image', 'image_variants', 'address', 'distance_km'})
+        
+        response = self.client.get('/api/restaurants/restaurant/near/',
+                                   {'lat': self.LAT, 'lng': self.LNG, 'radius': 10, 'limit': 2})
+        self.assertEqual([r['name'] for r in response.data['results']], ['Close', 'Walkable'])
+    
+    def test_geohash_follows_coordinates(self):
+        restaurant = Restaurant.objects.get(name='Close')
+        self.assertEqual(restaurant.geohash[:5], 'gcpvj')
+        restaurant.latitude, restaurant.longitude = 40.7128, -74.0060
+        restaurant.save(update_fields=['latitude', 'longitude'])
+        restaurant.refresh_from_db()
+        self.assertTrue(restaurant.geohash.startswith('dr5r'))
+        # The restaurant without coordinates never matches
+        self.assertEqual(self.restaurant.geohash, '')
+    
+    def test_covering_cells_contain_every_point_in_radius(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            lat, lng = rng.uniform(-80, 80), rng.uniform(-170, 170)
+            radius = rng.choice([0.2, 1, 3, 25, 50])
+            cells = geo.covering_cells(lat, lng, radius)
+            for _ in range(10):
+                # A point just inside the radius, in a random direction
+                bearing = rng.uniform(0, 2 * math.pi)
+                d_lat = radius * 0.99 * math.cos(bearing) / geo.KM_PER_DEGREE
+                d_lng = radius * 0.99 * math.sin(bearing) / (geo.KM_PER_DEGREE * math.cos(math.radians(lat + d_lat)))
+                point = geo.encode(lat + d_lat, lng + d_lng)
+                self.assertTrue(any(point.startswith(cell) for cell in cells), (lat, lng, radius))
+    
+    def test_lookup_narrows_with_index_ranges(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/restaurants/restaurant/near/', {'lat': self.LAT, 'lng': self.LNG})
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"geohash" >=', queries.captured_queries[0]['sql'])
+    
+    def test_invalid_parameters(self):
+        for params in ({'lng': 0}, {'lat': 91, 'lng': 0}, {'lat': 'x', 'lng': 0},
+                       {'lat': 0, 'lng': 0, 'radius': 0}, {'lat': 0, 'lng': 0, 'radius': 500}):
+            response = self.client.get('/api/restaurants/restaurant/near/', params)
+            self.assertEqual(response.status_code, 400, params)
+    
+    def test_coordinates_must_come_together(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post('/api/restaurants/restaurant/', {
+            'name': 'Half', 'description': 'x', 'address': 'x', 'phone_number': '1', 'latitude': 10,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+
+
+@override_settings(SHARED_CACHE=True)
+class ConditionalRequestTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = f'/api/restaurants/restaurant/{self.restaurant.id}/'
+
+    def test_matching_etag_is_answered_with_the_validator_query_only(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('Authorization', first['Vary'])
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_menu_changes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        item = self.restaurant.menu_items.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_follows_updates_without_signals(self):
+        url = '/api/restaurants/restaurant/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(name='Renamed', updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertNotIn('Last-Modified', self.client.get(url))
+
+    def test_list_validators_only_read_the_page(self):
+        url = '/api/restaurants/restaurant/'
+        Restaurant.objects.bulk_create([
+            Restaurant(owner=self.owner, name=f'Place {i}', description='x', address='x', phone_number='1')
+            for i in range(25)
+        ])
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertIn('LIMIT', queries[0]['sql'])
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        # The oldest restaurant is on a later page
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(name='Renamed', updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Restaurant.objects.filter(name='Place 24').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_owner_in_fields_follows_user_changes(self):
+        for index, params in enumerate(({'fields': 'id,owner'}, {'expand': 'owner'})):
+            etag = self.client.get(self.url, params)['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                self.owner.username = f'renamed-{index}'
+                self.owner.save()
+            response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['owner']['username'], self.owner.username)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_versioned_validators_need_a_shared_cache(self):
+        self.assertNotIn('ETag', self.client.get(self.url))
+        item = self.restaurant.menu_items.first()
+        self.assertIn('ETag', self.client.get(f'/api/restaurants/menu-items/{item.id}/'))
+
+    def test_etag_differs_per_user(self):
+        anonymous = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_if_modified_since_only_where_it_is_exact(self):
+        item = self.restaurant.menu_items.first()
+        item_url = f'/api/restaurants/menu-items/{item.id}/'
+        last_modified = self.client.get(item_url)['Last-Modified']
+        self.assertEqual(self.client.get(item_url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        # The restaurant also embeds versioned data its own date does not cover
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_malformed_and_missing_ids(self):
+        self.assertEqual(self.client.get('/api/restaurants/restaurant/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/restaurants/restaurant/999999/', HTTP_IF_NONE_MATCH='*').status_code,
+                         404)
+
+    @override_settings(CONDITIONAL_REQUESTS={'CACHE_RESPONSES': True})
+    def test_rendered_responses_are_cached_per_user(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        # The owner sees unavailable dishes, so gets their own copy
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(len(self.client.get(self.url).json()['menu_items']), 3)
+
+
+@override_settings(SHARED_CACHE=True)
+class MenuCacheTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = f'/api/restaurants/restaurant/{self.restaurant.id}/menu/'
+
+    def test_cached_menu_and_conditional_get_skip_the_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json()), 2)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, first.content)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_menu_item_changes_invalidate_the_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(restaurant=self.restaurant, name='New dish', description='Fresh', price='7.00')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_missing_restaurant_is_not_found(self):
+        self.assertEqual(self.client.get('/api/restaurants/restaurant/999999/menu/').status_code, 404)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_process_cache_validates_the_current_menu(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Changed by another process: no version bump reaches this one
+        MenuItem.objects.filter(restaurant=self.restaurant).update(is_available=False)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class SearchTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pizza = Restaurant.objects.create(
+            owner=self.owner, name='Pizza Palace', description='Wood fired pizza', address='5 Oven Rd', phone_number='1'
+        )
+        self.margherita = MenuItem.objects.create(
+            restaurant=self.pizza, name='Margherita pizza', description='Tomato and mozzarella', price='9.00'
+        )
+        MenuItem.objects.create(restaurant=self.restaurant, name='Pizza burger', description='Odd one', price='8.00',
+                                is_available=False)
+
+    def test_ranks_restaurants_and_dishes(self):
+        response = self.client.get('/api/restaurants/search/', {'q': 'pizza'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.data['restaurants']], [self.pizza.id])
+        # Unavailable dishes are not returned
+        self.assertEqual([d['id'] for d in response.data['dishes']], [self.margherita.id])
+        self.assertEqual(response.data['dishes'][0]['restaurant_name'], 'Pizza Palace')
+
+    def test_prefix_and_index_updates(self):
+        response = self.client.get('/api/restaurants/search/', {'q': 'marg', 'type': 'dishes'})
+        self.assertEqual([d['id'] for d in response.data['dishes']], [self.margherita.id])
+        self.assertNotIn('restaurants', response.data)
+
+        self.margherita.name = 'Quattro formaggi'
+        self.margherita.save()
+        response = self.client.get('/api/restaurants/search/', {'q': 'marg', 'type': 'dishes'})
+        self.assertEqual(response.data['dishes'], [])
+
+        self.pizza.delete()
+        response = self.client.get('/api/restaurants/search/', {'q': 'pizza'})
+        self.assertEqual(response.data['restaurants'], [])
+
+    def test_pagination(self):
+        for i in range(3):
+            Restaurant.objects.create(owner=self.owner, name=f'Noodle bar {i}', description='Noodles',
+                                      address='x', phone_number='1')
+        first = self.client.get('/api/restaurants/search/', {'q': 'noodle', 'type': 'restaurants', 'page_size': 2})
+        self.assertEqual(len(first.data['restaurants']), 2)
+        self.assertIsNotNone(first.data['next'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['restaurants']), 1)
+        self.assertIsNone(second.data['next'])
+
+    def test_page_size_is_handled_like_the_list_pagination(self):
+        for i in range(3):
+            Restaurant.objects.create(owner=self.owner, name=f'Noodle bar {i}', description='Noodles',
+                                      address='x', phone_number='1')
+        for page_size in ('abc', '0', '-1'):
+            response = self.client.get('/api/restaurants/search/', {'q': 'noodle', 'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['restaurants']), 3)
+        response = self.client.get('/api/restaurants/search/', {'q': 'noodle', 'page': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('page', response.data)
+
+    def test_query_is_required_and_sanitised(self):
+        self.assertEqual(self.client.get('/api/restaurants/search/').status_code, 400)
+        response = self.client.get('/api/restaurants/search/', {'q': '"pizza" OR NEAR('})
+        self.assertEqual(response.status_code, 200)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantTests(RestaurantTestMixin, TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def upload(self, color='red', size=(2000, 1500)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, format='JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_are_generated_off_the_request_path(self):
+        item = MenuItem.objects.create(restaurant=self.restaurant, name='Photo dish', description='x', price='4.00',
+                                       image=self.upload())
+        self.assertEqual(item.image_variants, {})
+        self.assertTrue(Job.objects.filter(name='restaurants.generate_image_variants', status='queued').exists())
+
+        run_pending_jobs()
+        item.refresh_from_db()
+        self.assertEqual(item.image_variants['source'], item.image.name)
+        with default_storage.open(item.image_variants['thumbnail']) as thumbnail:
+            image = Image.open(thumbnail)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertLessEqual(max(image.size), 160)
+
+        response = self.client.get(f'/api/restaurants/menu-items/{item.id}/')
+        self.assertEqual(set(response.data['image_variants']), {'thumbnail', 'card', 'full'})
+        self.assertTrue(response.data['image_variants']['thumbnail'].endswith('-thumbnail.webp'))
+
+    def test_generation_is_idempotent(self):
+        item = MenuItem.objects.create(restaurant=self.restaurant, name='Photo dish', description='x', price='4.00',
+                                       image=self.upload())
+        run_pending_jobs()
+        item.refresh_from_db()
+        variants = item.image_variants
+        enqueue('restaurants.generate_image_variants', {'model': 'restaurants.MenuItem', 'pk': item.pk})
+        run_pending_jobs()
+        item.refresh_from_db()
+        self.assertEqual(item.image_variants, variants)
+
+    def test_replacing_the_image_regenerates_variants(self):
+        restaurant = self.restaurant
+        restaurant.image = self.upload()
+        restaurant.save()
+        run_pending_jobs()
+        restaurant.refresh_from_db()
+        old_thumbnail = restaurant.image_variants['thumbnail']
+
+        restaurant.image = self.upload(color='blue')
+        restaurant.save()
+        response = self.client.get(f'/api/restaurants/restaurant/{restaurant.id}/')
+        # Stale variants are not exposed for the new image
+        self.assertEqual(response.data['image_variants'], {})
+        run_pending_jobs()
+        restaurant.refresh_from_db()
+        self.assertNotEqual(restaurant.image_variants['thumbnail'], old_thumbnail)
+
+
+class MenuImportExportTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.owner)
+        self.dish = MenuItem.objects.filter(restaurant=self.restaurant).order_by('id')[1]
+
+    def test_json_import_creates_updates_and_deactivates(self):
+        response = self.client.post('/api/restaurants/menu-items/import/', {
+            'restaurant': self.restaurant.id,
+            'deactivate_missing': True,
+            'items': [
+                {'id': self.dish.id, 'price': '6.25'},
+                {'name': 'Fresh salad', 'description': 'Greens', 'price': '4.00'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'created': 1, 'updated': 1, 'deactivated': 1})
+        self.dish.refresh_from_db()
+        self.assertEqual(str(self.dish.price), '6.25')
+        self.assertTrue(MenuItem.objects.filter(restaurant=self.restaurant, name='Fresh salad').exists())
+        self.assertEqual(MenuItem.objects.filter(restaurant=self.restaurant, is_available=True).count(), 2)
+
+    def test_csv_import_matches_by_name(self):
+        body = 'name,description,price,is_available\nGrill dish 2,Updated,7.00,no\nSoup,Hot,3.50,yes\n'
+        response = self.client.post(f'/api/restaurants/menu-items/import/?restaurant={self.restaurant.id}',
+                                    body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertFalse(MenuItem.objects.get(restaurant=self.restaurant, name='Grill dish 2').is_available)
+
+    def test_invalid_rows_are_reported_and_nothing_is_applied(self):
+        response = self.client.post('/api/restaurants/menu-items/import/', {
+            'restaurant': self.restaurant.id,
+            'items': [{'name': 'Good', 'description': 'x', 'price': '1.00'}, {'name': 'Bad', 'price': 'cheap'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1])
+        self.assertFalse(MenuItem.objects.filter(name='Good').exists())
+
+    def test_repeated_names_are_reported_for_new_and_existing_items(self):
+        response = self.client.post('/api/restaurants/menu-items/import/', {
+            'restaurant': self.restaurant.id,
+            'items': [
+                {'name': 'Soup', 'description': 'Hot', 'price': '3.50'},
+                {'name': 'soup ', 'description': 'Cold', 'price': '3.00'},
+                {'id': self.dish.id, 'price': '6.25'},
+                {'name': self.dish.name, 'price': '6.50'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 3])
+        self.assertFalse(MenuItem.objects.filter(name='Soup').exists())
+
+    def test_import_body_must_be_an_object_or_a_list(self):
+        response = self.client.post('/api/restaurants/menu-items/import/', 5, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+
+    def test_import_is_a_few_queries(self):
+        def run(count):
+            items = [{'name': f'Dish {i}', 'description': 'x', 'price': '2.00'} for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/restaurants/menu-items/import/',
+                                            {'restaurant': self.restaurant.id, 'items': items}, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+        # Only the number of INSERT batches grows (SQLite caps parameters per statement)
+        self.assertLess(run(1000), 25)
+
+    def test_other_owner_cannot_import(self):
+        other = User.objects.create_user(username='other', password='pass', role='restaurant_owner')
+        self.client.force_authenticate(other)
+        response = self.client.post('/api/restaurants/menu-items/import/',
+                                    {'restaurant': self.restaurant.id, 'items': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_streams_csv_and_json(self):
+        response = self.client.get('/api/restaurants/menu-items/export/', {'restaurant': self.restaurant.id})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,name,description,price,is_available')
+        self.assertEqual(len(lines), 4)
+        response = self.client.get('/api/restaurants/menu-items/export/',
+                                   {'restaurant': self.restaurant.id, 'output': 'json'})
+        items = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(items), 3)
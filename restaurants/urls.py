@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RestaurantViewSet, MenuItemViewSet
+from .views import RestaurantViewSet, MenuItemViewSet, SearchView
 
 router = DefaultRouter()
 router.register(r'restaurant', RestaurantViewSet)
 router.register(r'menu-items', MenuItemViewSet)
 
 urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,15 +1,39 @@
+import hashlib
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Q, Sum
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
 from .models import Restaurant, MenuItem
-from .serializers import RestaurantSerializer, MenuItemSerializer
+from .serializers import RestaurantSerializer, MenuItemSerializer, DishSearchResultSerializer
+from .search import search
+from .geo import nearby_ids
+from .parsers import CSVTextParser
+from .menu_import import MenuImportError, import_menu, parse_csv_rows, export_menu_csv, export_menu_json
 from .permissions import IsRestaurantOwnerOrReadOnly, IsMenuItemOwnerOrReadOnly
+from .cache import get_all_menus_version, get_menu_version, menu_etag, get_cached_menu, set_cached_menu
+from accounts.authentication import get_users_version
+from quickfood_backend.conditional import ConditionalGetMixin, cache_is_shared
+from quickfood_backend.pagination import CreatedAtCursorPagination, SearchPagination
+from orders.models import RestaurantDailyStats, MenuItemDailyStats
 
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsRestaurantOwnerOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         queryset = Restaurant.objects.all()
@@ -17,55 +41,394 @@ class RestaurantViewSet(viewsets.ModelViewSet):
             owner_id = self.request.query_params.get('owner', None)
             if owner_id and owner_id == 'me':
                 queryset = queryset.filter(owner=self.request.user)
+        
+        if self.action in ('list', 'retrieve', 'near'):
+            fields, expand = self.get_representation()
+            included = set(expand or ()) | set(fields or ())
+            full = fields is None and expand is None
+            if full or 'owner' in included:
+                queryset = queryset.select_related('owner')
+            if full or 'menu_items' in included:
+                queryset = queryset.prefetch_related(
+                    Prefetch('menu_items', queryset=self.get_menu_items_queryset())
+                )
         return queryset
     
+    def get_menu_items_queryset(self):
+        # Unavailable dishes are only shown to the restaurant's owner
+        visible = Q(is_available=True)
+        if self.request.user.is_authenticated:
+            visible |= Q(restaurant__owner_id=self.request.user.id)
+        return MenuItem.objects.filter(visible)
+    
+    def get_representation(self):
+        """
+        Return the ``(fields, expand)`` requested with ``?fields=`` and
+        ``?expand=``. Lists default to the summary representation; retrieve
+        stays fully expanded unless either parameter is given.
+        """
+        if hasattr(self, '_representation'):
+            return self._representation
+        
+        params = self.request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name] or None
+        expand = [name for name in params.get('expand', '').split(',') if name] or None
+        
+        allowed = set(RestaurantSerializer.Meta.fields)
+        unknown = sorted(set(fields or ()) - allowed)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+        unknown = sorted(set(expand or ()) - set(RestaurantSerializer.EXPANDABLE_FIELDS))
+        if unknown:
+            raise ValidationError({"expand": f"Cannot expand: {', '.join(unknown)}"})
+        
+        if self.action in ('list', 'near') and fields is None and expand is None:
+            expand = []
+        
+        self._representation = (fields, expand)
+        return self._representation
+    
+    def get_validator_versions(self, rows):
+        # Menu versions also move on restaurant writes made with update()
+        if self.detail:
+            versions = [get_menu_version(self.kwargs['pk'])]
+        else:
+            versions = [get_all_menus_version()]
+        fields, expand = self.get_representation()
+        included = set(expand or ()) | set(fields or ())
+        if (fields is None and expand is None) or 'owner' in included:
+            versions.append(get_users_version())
+        return versions
+    
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'near'):
+            kwargs['fields'], kwargs['expand'] = self.get_representation()
+        return super().get_serializer(*args, **kwargs)
+    
     def perform_create(self, serializer):
         # Check if the user has the restaurant_owner role
         if self.request.user.role != 'restaurant_owner':
             raise PermissionDenied("Only restaurant owners can create restaurants.")
         
-        # Check if a restaurant with the same name already exists
-        restaurant_name = serializer.validated_data.get('name')
-        if Restaurant.objects.filter(name__iexact=restaurant_name).exists():
+        self.save_unique_name(serializer, owner=self.request.user)
+    
+    def perform_update(self, serializer):
+        self.save_unique_name(serializer)
+    
+    def save_unique_name(self, serializer, **kwargs):
+        """
+        Save the restaurant, letting the case-insensitive unique index on name
+        reject duplicates instead of checking for them with a separate query.
+        """
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError as exc:
+            if Restaurant.NAME_CONSTRAINT not in str(exc):
+                raise
             raise ValidationError({"name": "A restaurant with this name already exists."})
-        
-        serializer.save(owner=self.request.user)
     
     @action(detail=True, methods=['get'])
     def menu(self, request, pk=None):
+        """
+        Available menu items, served from a per-restaurant cache of rendered
+        JSON. The cache version doubles as a strong ETag, so a matching
+        If-None-Match is answered with 304 without touching the database.
+        That needs a shared cache; otherwise the menu is rendered on every
+        request and the ETag is a hash of it.
+        """
+        try:
+            restaurant_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        
+        if cache_is_shared():
+            version, body = get_menu_version(restaurant_id), None
+        else:
+            # A per-process cache misses other processes' menu changes, so
+            # validate against the current menu instead of a cached version
+            body = self.render_menu()
+            version = hashlib.sha256(body).hexdigest()[:16]
+        etag = menu_etag(restaurant_id, version)
+        
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            response = HttpResponseNotModified()
+        else:
+            if body is None:
+                body = get_cached_menu(restaurant_id, version)
+            if body is None:
+                body = self.render_menu()
+                set_cached_menu(restaurant_id, version, body)
+            response = HttpResponse(body, content_type='application/json')
+        
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    def render_menu(self):
         restaurant = self.get_object()
         menu_items = MenuItem.objects.filter(restaurant=restaurant, is_available=True)
-        serializer = MenuItemSerializer(menu_items, many=True)
-        return Response(serializer.data)
+        return JSONRenderer().render(MenuItemSerializer(menu_items, many=True).data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def stats(self, request, pk=None):
+        """
+        Daily sales for one restaurant, read from the rollup tables so the cost
+        depends on the number of days rather than the number of orders.
+        """
+        restaurant = self.get_object()
+        if restaurant.owner_id != request.user.id:
+            raise PermissionDenied("Only the restaurant owner can view sales stats.")
+        
+        date_to = self.parse_stats_date('to') or timezone.localdate()
+        date_from = self.parse_stats_date('from') or date_to - timedelta(days=29)
+        if date_from > date_to:
+            raise ValidationError({"from": "Must not be after 'to'."})
+        if (date_to - date_from).days >= 366:
+            raise ValidationError({"from": "The date range cannot exceed 366 days."})
+        
+        days = list(RestaurantDailyStats.objects.filter(
+            restaurant=restaurant, date__range=(date_from, date_to)
+        ).values('date', 'order_count', 'cancelled_count', 'delivered_count', 'revenue'))
+        
+        top_items = MenuItemDailyStats.objects.filter(
+            restaurant=restaurant, date__range=(date_from, date_to)
+        ).values('menu_item_id', 'menu_item__name').annotate(
+            quantity_sold=Sum('quantity'), item_revenue=Sum('revenue')
+        ).filter(quantity_sold__gt=0).order_by('-quantity_sold', 'menu_item_id')[:10]
+        
+        return Response({
+            "restaurant": restaurant.id,
+            "from": date_from,
+            "to": date_to,
+            "totals": {
+                "order_count": sum(day['order_count'] for day in days),
+                "cancelled_count": sum(day['cancelled_count'] for day in days),
+                "delivered_count": sum(day['delivered_count'] for day in days),
+                "revenue": sum((day['revenue'] for day in days), 0),
+            },
+            "days": days,
+            "top_items": [
+                {
+                    "menu_item": item['menu_item_id'],
+                    "name": item['menu_item__name'],
+                    "quantity": item['quantity_sold'],
+                    "revenue": item['item_revenue'],
+                }
+                for item in top_items
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def near(self, request):
+        """
+        Restaurants within ``radius`` km of ``lat``/``lng``, nearest first,
+        each with its ``distance_km``. Accepts ``fields``/``expand`` like the
+        list endpoint.
+        """
+        latitude = self.parse_coordinate('lat', 90)
+        longitude = self.parse_coordinate('lng', 180)
+        radius = self.parse_number('radius', settings.NEARBY_DEFAULT_RADIUS_KM, 0, settings.NEARBY_MAX_RADIUS_KM)
+        if radius <= 0:
+            raise ValidationError({"radius": "Must be greater than 0."})
+        limit = int(self.parse_number('limit', CreatedAtCursorPagination.page_size, 1,
+                                      CreatedAtCursorPagination.max_page_size))
+        
+        queryset = self.get_queryset()
+        matches = nearby_ids(queryset, latitude, longitude, radius, limit)
+        restaurants = queryset.in_bulk([pk for pk, _ in matches])
+        
+        results = []
+        for pk, distance in matches:
+            data = self.get_serializer(restaurants[pk]).data
+            data['distance_km'] = round(distance, 3)
+            results.append(data)
+        return Response({"results": results})
+    
+    def parse_coordinate(self, name, bound):
+        if name not in self.request.query_params:
+            raise ValidationError({name: "This parameter is required."})
+        return self.parse_number(name, None, -bound, bound)
+    
+    def parse_number(self, name, default, minimum, maximum):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValidationError({name: "Enter a number."})
+        if not minimum <= number <= maximum:
+            raise ValidationError({name: f"Must be between {minimum} and {maximum}."})
+        return number
+    
+    def parse_stats_date(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValidationError({name: "Enter a valid date (YYYY-MM-DD)."})
+        return parsed
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsMenuItemOwnerOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
+    IMPORT_LIMIT = 2000
     
     def get_queryset(self):
+        queryset = MenuItem.objects.all()
         restaurant_id = self.request.query_params.get('restaurant', None)
         if restaurant_id:
-            return MenuItem.objects.filter(restaurant_id=restaurant_id)
-        return MenuItem.objects.all()
+            queryset = queryset.filter(restaurant_id=restaurant_id)
+        if self.detail:
+            # Fetched with the item so the ownership check needs no extra query
+            queryset = queryset.annotate(restaurant_owner_id=F('restaurant__owner_id'))
+        return queryset
     
     def perform_create(self, serializer):
         # Check if the user has the restaurant_owner role
         if self.request.user.role != 'restaurant_owner':
             raise PermissionDenied("Only restaurant owners can create menu items.")
         
-        restaurant_id = self.request.data.get('restaurant')
+        restaurant = self.get_owned_restaurant(self.request.data.get('restaurant'))
+        serializer.save(restaurant=restaurant)
+    
+    def get_owned_restaurant(self, restaurant_id):
+        """
+        Load the restaurant menu items are being written to with one query and
+        check that the caller owns it.
+        """
         if not restaurant_id:
             raise ValidationError({"restaurant": "Restaurant ID is required."})
-            
-        # Check if the restaurant exists
-        if not Restaurant.objects.filter(id=restaurant_id).exists():
+        
+        try:
+            restaurant = Restaurant.objects.filter(id=int(restaurant_id)).first()
+        except (TypeError, ValueError):
+            restaurant = None
+        if restaurant is None:
             raise ValidationError({"restaurant": f"Restaurant with ID {restaurant_id} does not exist."})
-            
-        restaurant = Restaurant.objects.get(id=restaurant_id)
         
         # Check if the user is the owner of the restaurant
-        if restaurant.owner != self.request.user:
+        if restaurant.owner_id != self.request.user.id:
             raise PermissionDenied("You can only add menu items to restaurants you own.")
+        return restaurant
+    
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[JSONParser, MultiPartParser, FormParser, CSVTextParser])
+    def import_menu(self, request):
+        """
+        Create, update and deactivate a restaurant's menu items in one request.
+        Accepts JSON ``{"restaurant": id, "items": [...], "deactivate_missing": bool}``,
+        a raw ``text/csv`` body or a multipart ``file`` upload (CSV) with
+        ``?restaurant=<id>``.
+        """
+        if request.user.role != 'restaurant_owner':
+            raise PermissionDenied("Only restaurant owners can import menu items.")
         
-        serializer.save(restaurant=restaurant)
+        data = request.data
+        params = request.query_params
+        if isinstance(data, str):
+            rows, options = parse_csv_rows(data), params
+        elif 'file' in request.FILES:
+            try:
+                text = request.FILES['file'].read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise ValidationError({"file": "CSV files must be UTF-8 encoded."})
+            rows, options = parse_csv_rows(text), {**params.dict(), **data.dict()}
+        elif isinstance(data, list):
+            rows, options = data, params
+        elif not isinstance(data, dict):
+            raise ValidationError({"non_field_errors": "Expected an object, a list of menu items or CSV."})
+        else:
+            rows, options = data.get('items'), {**params.dict(), **data}
+            if not isinstance(rows, list):
+                raise ValidationError({"items": "A list of menu items is required."})
+        
+        if len(rows) > self.IMPORT_LIMIT:
+            raise ValidationError({"items": f"At most {self.IMPORT_LIMIT} items can be imported at once."})
+        
+        restaurant = self.get_owned_restaurant(options.get('restaurant'))
+        deactivate_missing = str(options.get('deactivate_missing', '')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            result = import_menu(restaurant, rows, deactivate_missing=deactivate_missing)
+        except MenuImportError as exc:
+            return Response({"errors": exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every menu item of one of the caller's restaurants as CSV
+        (default) or JSON with ``?output=json``.
+        """
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        restaurant = self.get_owned_restaurant(request.query_params.get('restaurant'))
+        
+        queryset = MenuItem.objects.filter(restaurant=restaurant).order_by('id')
+        if request.query_params.get('output') == 'json':
+            response = StreamingHttpResponse(export_menu_json(queryset), content_type='application/json')
+        else:
+            response = StreamingHttpResponse(export_menu_csv(queryset), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="menu-{restaurant.id}.csv"'
+        return response
+
+
+class SearchView(APIView):
+    """
+    Relevance-ranked search over restaurants and available dishes.
+    """
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchPagination
+    MAX_PAGE = 50
+    TYPES = ('all', 'restaurants', 'dishes')
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({"q": "This parameter is required."})
+        
+        search_type = request.query_params.get('type', 'all')
+        if search_type not in self.TYPES:
+            raise ValidationError({"type": f"Must be one of: {', '.join(self.TYPES)}"})
+        
+        try:
+            page = int(request.query_params.get('page', 1))
+        except ValueError:
+            raise ValidationError({"page": "Enter a whole number."})
+        if not 1 <= page <= self.MAX_PAGE:
+            raise ValidationError({"page": f"Must be between 1 and {self.MAX_PAGE}."})
+        page_size = self.pagination_class().get_page_size(request)
+        
+        offset = (page - 1) * page_size
+        data = {"query": query, "page": page}
+        has_more = False
+        context = {'request': request}
+        
+        if search_type in ('all', 'restaurants'):
+            # Fetch one extra row to know whether another page exists without a COUNT
+            matches = search(Restaurant, query, page_size + 1, offset)
+            has_more |= len(matches) > page_size
+            data['restaurants'] = [
+                dict(RestaurantSerializer(restaurant, fields=RestaurantSerializer.SUMMARY_FIELDS, context=context).data,
+                     rank=rank)
+                for restaurant, rank in matches[:page_size]
+            ]
+        
+        if search_type in ('all', 'dishes'):
+            matches = search(MenuItem, query, page_size + 1, offset)
+            has_more |= len(matches) > page_size
+            data['dishes'] = [
+                dict(DishSearchResultSerializer(item, context=context).data, rank=rank)
+                for item, rank in matches[:page_size]
+            ]
+        
+        data['next'] = None
+        if has_more and page < self.MAX_PAGE:
+            data['next'] = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+        return Response(data)